@@ -4,7 +4,25 @@
  */
 
 const algosdk = require('algosdk');
+const crypto = require('crypto');
 const fs = require('fs');
+const path = require('path');
+
+// ARC-4 methods the NameRegistry dispatches on: each call's first argument is
+// the method's 4-byte selector and strings carry a 2-byte length prefix
+const REGISTER = algosdk.ABIMethod.fromSignature('register(string,string,uint64)void');
+const RESOLVE = algosdk.ABIMethod.fromSignature('resolve(string)void');
+const EXISTS = algosdk.ABIMethod.fromSignature('exists(string)void');
+const ARC4_STRING = new algosdk.ABIStringType();
+
+// register must directly follow a payment covering the name box's minimum
+// balance, sized by the contract for the largest (64-byte) CID
+const NAME_BOX_MBR = 2500 + 400 * (32 + 32 + 8 + 8 + 64);
+
+// Boxes are named by sha256(name)
+const nameBoxRefs = (name) => [
+    { appIndex: 0, name: new Uint8Array(crypto.createHash('sha256').update(name).digest()) }
+];
 
 class NameRegistryAPI {
     constructor() {
@@ -20,7 +38,7 @@ class NameRegistryAPI {
 
     loadDeploymentInfo() {
         try {
-            const data = fs.readFileSync('../contracts/deployment_info.json', 'utf8');
+            const data = fs.readFileSync(path.join(__dirname, '../contracts/deployment_info.json'), 'utf8');
             return JSON.parse(data);
         } catch (error) {
             throw new Error('Could not load deployment_info.json. Please deploy contracts first.');
@@ -43,30 +61,50 @@ class NameRegistryAPI {
                 });
             }
 
+            // The price is stored on chain as a uint64 of microAlgos
+            if (!Number.isSafeInteger(Number(price)) || Number(price) < 0) {
+                return res.status(400).json({
+                    error: 'price must be a non-negative integer number of microAlgos'
+                });
+            }
+
             // Get sender account
             const senderAccount = algosdk.mnemonicToSecretKey(senderMnemonic);
             
             // Get suggested parameters
             const params = await this.algodClient.getTransactionParams().do();
             
+            // Payment covering the new name box's minimum balance
+            const paymentTxn = algosdk.makePaymentTxnWithSuggestedParamsFromObject({
+                from: senderAccount.addr,
+                to: algosdk.getApplicationAddress(this.nameRegistryAppId),
+                amount: NAME_BOX_MBR,
+                suggestedParams: params
+            });
+
             // Create application call transaction
             const appArgs = [
-                new Uint8Array(Buffer.from('register')),
-                new Uint8Array(Buffer.from(name)),
-                new Uint8Array(Buffer.from(cid)),
-                new Uint8Array(Buffer.from(price.toString()))
+                REGISTER.getSelector(),
+                ARC4_STRING.encode(name),
+                ARC4_STRING.encode(cid),
+                algosdk.encodeUint64(Number(price))
             ];
 
-            const txn = algosdk.makeApplicationNoOpTxn(
-                senderAccount.addr,
-                params,
-                this.nameRegistryAppId,
-                appArgs
-            );
+            const txn = algosdk.makeApplicationCallTxnFromObject({
+                from: senderAccount.addr,
+                suggestedParams: params,
+                appIndex: this.nameRegistryAppId,
+                onComplete: algosdk.OnApplicationComplete.NoOpOC,
+                appArgs: appArgs,
+                boxes: nameBoxRefs(name)
+            });
 
-            // Sign and submit transaction
-            const signedTxn = txn.signTxn(senderAccount.sk);
-            const { txId } = await this.algodClient.sendRawTransaction(signedTxn).do();
+            // Sign and submit the payment and call as one group
+            const txns = [paymentTxn, txn];
+            algosdk.assignGroupID(txns);
+            const signedTxns = txns.map(groupTxn => groupTxn.signTxn(senderAccount.sk));
+            await this.algodClient.sendRawTransaction(signedTxns).do();
+            const txId = txn.txID();
             
             // Wait for confirmation
             const confirmedTxn = await algosdk.waitForConfirmation(this.algodClient, txId, 4);
@@ -100,34 +138,11 @@ class NameRegistryAPI {
                 return res.status(400).json({ error: 'Name parameter required' });
             }
 
-            // Create a temporary account for the read-only transaction
-            const tempAccount = algosdk.generateAccount();
-            
-            // Get suggested parameters
-            const params = await this.algodClient.getTransactionParams().do();
-            
-            // Create application call transaction
-            const appArgs = [
-                new Uint8Array(Buffer.from('resolve')),
-                new Uint8Array(Buffer.from(name))
-            ];
-
-            const txn = algosdk.makeApplicationNoOpTxn(
-                tempAccount.addr,
-                params,
-                this.nameRegistryAppId,
-                appArgs
-            );
-
-            // Sign transaction (but don't submit - we'll use dryrun)
-            const signedTxn = txn.signTxn(tempAccount.sk);
+            // resolve fails when the name has no box, which simulation
+            // reports as a failure message rather than an error
+            const { failed, logs } = await this.simulateCall(RESOLVE, name);
 
-            // Use dryrun to execute without submitting
-            const dryrunRequest = algosdk.createDryrun(this.algodClient, [signedTxn]);
-            const dryrunResult = await this.algodClient.dryrun(dryrunRequest).do();
-
-            if (dryrunResult.txns.length > 0 && dryrunResult.txns[0].logs) {
-                const logs = dryrunResult.txns[0].logs;
+            if (!failed && logs.length > 0) {
                 const nameData = this.parseResolveLogs(logs);
                 
                 res.json({
@@ -162,32 +177,9 @@ class NameRegistryAPI {
                 return res.status(400).json({ error: 'Name parameter required' });
             }
 
-            // Create a temporary account for the read-only transaction
-            const tempAccount = algosdk.generateAccount();
-            
-            // Get suggested parameters
-            const params = await this.algodClient.getTransactionParams().do();
-            
-            // Create application call transaction
-            const appArgs = [
-                new Uint8Array(Buffer.from('exists')),
-                new Uint8Array(Buffer.from(name))
-            ];
-
-            const txn = algosdk.makeApplicationNoOpTxn(
-                tempAccount.addr,
-                params,
-                this.nameRegistryAppId,
-                appArgs
-            );
-
-            // Sign and use dryrun
-            const signedTxn = txn.signTxn(tempAccount.sk);
-            const dryrunRequest = algosdk.createDryrun(this.algodClient, [signedTxn]);
-            const dryrunResult = await this.algodClient.dryrun(dryrunRequest).do();
+            const { failed, logs } = await this.simulateCall(EXISTS, name);
 
-            if (dryrunResult.txns.length > 0 && dryrunResult.txns[0].logs) {
-                const logs = dryrunResult.txns[0].logs;
+            if (!failed && logs.length > 0) {
                 const exists = this.parseExistsLogs(logs);
                 
                 res.json({
@@ -246,57 +238,78 @@ class NameRegistryAPI {
 
     loadDemoData() {
         try {
-            const data = fs.readFileSync('../contracts/demo_data.json', 'utf8');
+            const data = fs.readFileSync(path.join(__dirname, '../contracts/demo_data.json'), 'utf8');
             return JSON.parse(data);
         } catch (error) {
             return { registered_names: [] };
         }
     }
 
+    /**
+     * Evaluate a read-only call taking a name against current ledger state
+     * without signing or submitting it (dryrun cannot read boxes). The
+     * creator account is the sender since simulation still charges the fee
+     */
+    async simulateCall(method, name) {
+        const params = await this.algodClient.getTransactionParams().do();
+        const txn = algosdk.makeApplicationCallTxnFromObject({
+            from: this.deploymentInfo.creator_address,
+            suggestedParams: params,
+            appIndex: this.nameRegistryAppId,
+            onComplete: algosdk.OnApplicationComplete.NoOpOC,
+            appArgs: [method.getSelector(), ARC4_STRING.encode(name)],
+            boxes: nameBoxRefs(name)
+        });
+
+        const request = new algosdk.modelsv2.SimulateRequest({
+            txnGroups: [
+                new algosdk.modelsv2.SimulateRequestTransactionGroup({
+                    txns: [algosdk.decodeObj(algosdk.encodeUnsignedSimulateTransaction(txn))]
+                })
+            ],
+            allowEmptySignatures: true
+        });
+        const result = await this.algodClient.simulateTransactions(request).do();
+
+        const group = result.txnGroups[0];
+        return {
+            failed: Boolean(group.failureMessage),
+            logs: (group.txnResults[0].txnResult.logs || []).map(log => Buffer.from(log))
+        };
+    }
+
+    // Each log is an ASCII label followed by raw bytes; the owner is a
+    // 32-byte public key and the price and timestamp are 8-byte big-endian
     parseResolveLogs(logs) {
         const nameData = {};
         
-        logs.forEach(logBase64 => {
-            const logStr = Buffer.from(logBase64, 'base64').toString();
+        logs.forEach(log => {
+            const logStr = log.toString('latin1');
             
             if (logStr.startsWith('OWNER:')) {
-                nameData.owner = logStr.substring(6);
+                nameData.owner = algosdk.encodeAddress(new Uint8Array(log.subarray(6, 38)));
             } else if (logStr.startsWith('CID:')) {
-                nameData.cid = logStr.substring(4);
+                nameData.cid = log.subarray(4).toString();
             } else if (logStr.startsWith('PRICE:')) {
-                const priceBytes = logStr.substring(6);
-                // Convert 8-byte big-endian to number
-                nameData.price_microalgos = this.bytesToNumber(priceBytes);
+                nameData.price_microalgos = Number(log.readBigUInt64BE(6));
                 nameData.price_algo = nameData.price_microalgos / 1_000_000;
             } else if (logStr.startsWith('TIMESTAMP:')) {
-                const timestampBytes = logStr.substring(10);
-                nameData.timestamp = this.bytesToNumber(timestampBytes);
+                nameData.timestamp = Number(log.readBigUInt64BE(10));
             }
         });
         
         return nameData;
     }
 
+    // EXISTS:<name>:<1|0>; the flag is the final byte
     parseExistsLogs(logs) {
-        for (const logBase64 of logs) {
-            const logStr = Buffer.from(logBase64, 'base64').toString();
-            
-            if (logStr.startsWith('EXISTS:')) {
-                const parts = logStr.split(':');
-                return parts[2] === '1';
+        for (const log of logs) {
+            if (log.toString('latin1').startsWith('EXISTS:')) {
+                return log.subarray(log.length - 1).toString() === '1';
             }
         }
         return false;
     }
-
-    bytesToNumber(byteStr) {
-        // Simple conversion - in production, properly handle big-endian 8-byte integers
-        let num = 0;
-        for (let i = 0; i < byteStr.length && i < 8; i++) {
-            num = (num << 8) + byteStr.charCodeAt(i);
-        }
-        return num;
-    }
 }
 
 module.exports = NameRegistryAPI;
\ No newline at end of file
@@ -264,8 +264,8 @@ router.post('/prepare-publish',
 
       await databaseService.storePendingModel(pendingModel);
 
-      // Build unsigned transaction for wallet signing
-      const unsignedTxn = await blockchainService.buildModelRegistrationTransaction(
+      // Build unsigned transaction group (storage deposit + publish call) for wallet signing
+      const unsignedTxnGroup = await blockchainService.buildModelRegistrationTransactions(
         publisherAddress,
         ipfsResult.cid,
         JSON.stringify({ name, description, framework, type, tags: pendingModel.tags })
@@ -276,8 +276,10 @@ router.post('/prepare-publish',
         data: {
           modelId,
           cid: ipfsResult.cid,
-          unsignedTransaction: Buffer.from(unsignedTxn.transaction.toByte()).toString('base64'),
-          transactionDescription: unsignedTxn.description
+          unsignedTransactions: unsignedTxnGroup.transactions.map(txn => 
+            Buffer.from(txn.toByte()).toString('base64')
+          ),
+          transactionDescriptions: unsignedTxnGroup.descriptions
         }
       });
 
@@ -298,7 +300,7 @@ router.post('/prepare-publish',
 router.post('/confirm-publish',
   [
     body('modelId').isUUID().withMessage('Valid model ID required'),
-    body('signedTransaction').isString().withMessage('Signed transaction required'),
+    body('signedTransactions').isArray().withMessage('Signed transactions required'),
     body('publisherAddress').isLength({ min: 58, max: 58 }).withMessage('Valid publisher address required')
   ],
   async (req: Request, res: Response) => {
@@ -312,7 +314,7 @@ router.post('/confirm-publish',
         });
       }
 
-      const { modelId, signedTransaction, publisherAddress } = req.body;
+      const { modelId, signedTransactions, publisherAddress } = req.body;
 
       // Get pending model
       const pendingModel = await databaseService.getPendingModel(modelId);
@@ -331,9 +333,24 @@ router.post('/confirm-publish',
         });
       }
 
-      // Submit signed transaction
-      const signedTxnBytes = Buffer.from(signedTransaction, 'base64');
-      const txnId = await blockchainService.submitSignedTransaction(signedTxnBytes);
+      // Submit signed transaction group
+      const signedTxnBytes = signedTransactions.map((txn: string) => 
+        Buffer.from(txn, 'base64')
+      );
+      let txnId: string;
+      try {
+        txnId = await blockchainService.submitSignedTransactionGroup(signedTxnBytes);
+      } catch (error) {
+        // The new model's box was predicted from the contract counter when the
+        // transactions were prepared; too many records created since then
+        if (blockchainService.isStaleRecordBoxError(error)) {
+          return res.status(409).json({
+            success: false,
+            error: 'Model id changed since preparation; prepare the transactions again'
+          });
+        }
+        throw error;
+      }
 
       // Wait for confirmation
       const confirmation = await blockchainService.waitForConfirmation(txnId);
@@ -347,7 +364,7 @@ router.post('/confirm-publish',
       }
 
       // Extract blockchain model ID from logs
-      const blockchainModelId = this.extractModelIdFromLogs(confirmation.logs || []);
+      const blockchainModelId = blockchainService.extractModelId(confirmation.rawLogs || []);
 
       // Move from pending to published
       await databaseService.publishModel({
@@ -509,7 +526,20 @@ router.post('/confirm-purchase',
       const signedTxnBytes = signedTransactions.map((txn: string) => 
         Buffer.from(txn, 'base64')
       );
-      const txnId = await blockchainService.submitSignedTransactionGroup(signedTxnBytes);
+      let txnId: string;
+      try {
+        txnId = await blockchainService.submitSignedTransactionGroup(signedTxnBytes);
+      } catch (error) {
+        // The new escrow's box was predicted from the contract counter when the
+        // transactions were prepared; too many records created since then
+        if (blockchainService.isStaleRecordBoxError(error)) {
+          return res.status(409).json({
+            success: false,
+            error: 'Escrow id changed since preparation; prepare the transactions again'
+          });
+        }
+        throw error;
+      }
 
       // Wait for confirmation
       const confirmation = await blockchainService.waitForConfirmation(txnId);
@@ -523,7 +553,7 @@ router.post('/confirm-purchase',
       }
 
       // Extract escrow ID from logs
-      const escrowId = this.extractEscrowIdFromLogs(confirmation.logs || []);
+      const escrowId = blockchainService.extractEscrowId(confirmation.rawLogs || []);
 
       // Update purchase status
       await databaseService.confirmPurchase(purchaseId, {
@@ -690,30 +720,6 @@ router.get('/:id',
 );
 
 // Helper methods
-function extractModelIdFromLogs(logs: string[]): number {
-  for (const log of logs) {
-    if (log.startsWith('MODEL_PUBLISHED:')) {
-      const match = log.match(/MODEL_PUBLISHED:(\d+):/);
-      if (match) {
-        return parseInt(match[1]);
-      }
-    }
-  }
-  return 0;
-}
-
-function extractEscrowIdFromLogs(logs: string[]): number {
-  for (const log of logs) {
-    if (log.startsWith('ESCROW_CREATED:')) {
-      const match = log.match(/ESCROW_CREATED:(\d+):/);
-      if (match) {
-        return parseInt(match[1]);
-      }
-    }
-  }
-  return 0;
-}
-
 async function generateModelAccessKey(modelId: string, buyerAddress: string): Promise<void> {
   // This would generate an RSA-encrypted access key for the buyer
   // Implementation would depend on the specific encryption scheme
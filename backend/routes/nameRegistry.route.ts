@@ -5,6 +5,7 @@
 
 import express from 'express';
 import algosdk from 'algosdk';
+import crypto from 'crypto';
 import fs from 'fs';
 import path from 'path';
 
@@ -41,37 +42,75 @@ const algodClient = new algosdk.Algodv2(algodToken, algodServer, '');
 const deploymentInfo = loadDeploymentInfo();
 const nameRegistryAppId = deploymentInfo.contracts.name_registry.app_id;
 
+// ARC-4 methods the NameRegistry dispatches on: each call's first argument is
+// the method's 4-byte selector and strings carry a 2-byte length prefix
+const REGISTER = algosdk.ABIMethod.fromSignature('register(string,string,uint64)void');
+const RESOLVE = algosdk.ABIMethod.fromSignature('resolve(string)void');
+const EXISTS = algosdk.ABIMethod.fromSignature('exists(string)void');
+const ARC4_STRING = new algosdk.ABIStringType();
+
+// register must directly follow a payment covering the name box's minimum
+// balance, sized by the contract for the largest (64-byte) CID
+const NAME_BOX_MBR = 2500 + 400 * (32 + 32 + 8 + 8 + 64);
+
+// Boxes are named by sha256(name)
+const nameBoxRefs = (name: string): algosdk.BoxReference[] => [
+  { appIndex: 0, name: new Uint8Array(crypto.createHash('sha256').update(name).digest()) }
+];
+
+/**
+ * Evaluate a read-only call taking a name against current ledger state
+ * without signing or submitting it (dryrun cannot read boxes). The creator
+ * account is the sender since simulation still charges the fee
+ */
+const simulateCall = async (method: algosdk.ABIMethod, name: string) => {
+  const params = await algodClient.getTransactionParams().do();
+  const txn = algosdk.makeApplicationCallTxnFromObject({
+    from: deploymentInfo.creator_address,
+    suggestedParams: params,
+    appIndex: nameRegistryAppId,
+    onComplete: algosdk.OnApplicationComplete.NoOpOC,
+    appArgs: [method.getSelector(), ARC4_STRING.encode(name)],
+    boxes: nameBoxRefs(name)
+  });
+
+  const request = new algosdk.modelsv2.SimulateRequest({
+    txnGroups: [
+      new algosdk.modelsv2.SimulateRequestTransactionGroup({
+        txns: [algosdk.decodeObj(algosdk.encodeUnsignedSimulateTransaction(txn)) as algosdk.EncodedSignedTransaction]
+      })
+    ],
+    allowEmptySignatures: true
+  });
+  const result = await algodClient.simulateTransactions(request).do();
+
+  const group = result.txnGroups[0];
+  return {
+    failed: Boolean(group.failureMessage),
+    logs: (group.txnResults[0].txnResult.logs || []).map(log => Buffer.from(log))
+  };
+};
+
 /**
- * Parse resolution logs from contract execution
+ * Parse resolution logs from contract execution: each log is an ASCII label
+ * followed by raw bytes; the owner is a 32-byte public key and the price and
+ * timestamp are 8-byte big-endian
  */
-const parseResolveLogs = (logs: string[]): any => {
+const parseResolveLogs = (logs: Buffer[]): any => {
   const nameData: any = {};
   
-  logs.forEach(logBase64 => {
-    const logStr = Buffer.from(logBase64, 'base64').toString();
+  logs.forEach(log => {
+    const logStr = log.toString('latin1');
     
     if (logStr.startsWith('OWNER:')) {
-      // Owner is stored as raw bytes - convert to base32 address
-      const ownerBytes = logStr.substring(6);
-      nameData.owner = algosdk.encodeAddress(new Uint8Array(Buffer.from(ownerBytes, 'binary')));
+      nameData.owner = algosdk.encodeAddress(new Uint8Array(log.subarray(6, 38)));
     } else if (logStr.startsWith('CID:')) {
-      nameData.cid = logStr.substring(4);
+      nameData.cid = log.subarray(4).toString();
     } else if (logStr.startsWith('PRICE:')) {
-      const priceBytes = Buffer.from(logStr.substring(6), 'binary');
-      // Convert 8-byte big-endian to number
-      let price = 0;
-      for (let i = 0; i < priceBytes.length && i < 8; i++) {
-        price = (price * 256) + priceBytes[i];
-      }
-      nameData.price_microalgos = price;
-      nameData.price_algo = price / 1_000_000;
+      nameData.price_microalgos = Number(log.readBigUInt64BE(6));
+      nameData.price_algo = nameData.price_microalgos / 1_000_000;
     } else if (logStr.startsWith('TIMESTAMP:')) {
-      const timestampBytes = Buffer.from(logStr.substring(10), 'binary');
-      let timestamp = 0;
-      for (let i = 0; i < timestampBytes.length && i < 8; i++) {
-        timestamp = (timestamp * 256) + timestampBytes[i];
-      }
-      nameData.timestamp = timestamp;
+      nameData.timestamp = Number(log.readBigUInt64BE(10));
     }
   });
   
@@ -93,30 +132,50 @@ router.post('/register', async (req, res) => {
       });
     }
 
+    // The price is stored on chain as a uint64 of microAlgos
+    if (!Number.isSafeInteger(Number(price)) || Number(price) < 0) {
+      return res.status(400).json({
+        error: 'price must be a non-negative integer number of microAlgos'
+      });
+    }
+
     // Get sender account
     const senderAccount = algosdk.mnemonicToSecretKey(senderMnemonic);
     
     // Get suggested parameters
     const params = await algodClient.getTransactionParams().do();
     
+    // Payment covering the new name box's minimum balance
+    const paymentTxn = algosdk.makePaymentTxnWithSuggestedParamsFromObject({
+      from: senderAccount.addr,
+      to: algosdk.getApplicationAddress(nameRegistryAppId),
+      amount: NAME_BOX_MBR,
+      suggestedParams: params
+    });
+
     // Create application call transaction
     const appArgs = [
-      new Uint8Array(Buffer.from('register')),
-      new Uint8Array(Buffer.from(name)),
-      new Uint8Array(Buffer.from(cid)),
-      new Uint8Array(Buffer.from(price.toString()))
+      REGISTER.getSelector(),
+      ARC4_STRING.encode(name),
+      ARC4_STRING.encode(cid),
+      algosdk.encodeUint64(Number(price))
     ];
 
-    const txn = algosdk.makeApplicationNoOpTxn(
-      senderAccount.addr,
-      params,
-      nameRegistryAppId,
-      appArgs
-    );
+    const txn = algosdk.makeApplicationCallTxnFromObject({
+      from: senderAccount.addr,
+      suggestedParams: params,
+      appIndex: nameRegistryAppId,
+      onComplete: algosdk.OnApplicationComplete.NoOpOC,
+      appArgs: appArgs,
+      boxes: nameBoxRefs(name)
+    });
 
-    // Sign and submit transaction
-    const signedTxn = txn.signTxn(senderAccount.sk);
-    const { txId } = await algodClient.sendRawTransaction(signedTxn).do();
+    // Sign and submit the payment and call as one group
+    const txns = [paymentTxn, txn];
+    algosdk.assignGroupID(txns);
+    const signedTxns = txns.map(groupTxn => groupTxn.signTxn(senderAccount.sk));
+    await algodClient.sendRawTransaction(signedTxns).do();
+    const txId = txn.txID();
     
     // Wait for confirmation
     const confirmedTxn = await algosdk.waitForConfirmation(algodClient, txId, 4);
@@ -151,34 +210,11 @@ router.get('/:name/resolve', async (req, res) => {
       return res.status(400).json({ error: 'Name parameter required' });
     }
 
-    // Create a temporary account for the read-only transaction
-    const tempAccount = algosdk.generateAccount();
-    
-    // Get suggested parameters
-    const params = await algodClient.getTransactionParams().do();
-    
-    // Create application call transaction
-    const appArgs = [
-      new Uint8Array(Buffer.from('resolve')),
-      new Uint8Array(Buffer.from(name))
-    ];
-
-    const txn = algosdk.makeApplicationNoOpTxn(
-      tempAccount.addr,
-      params,
-      nameRegistryAppId,
-      appArgs
-    );
-
-    // Sign transaction
-    const signedTxn = txn.signTxn(tempAccount.sk);
-
-    // Use dryrun to execute without submitting
-    const dryrunRequest = algosdk.createDryrun(algodClient, [signedTxn]);
-    const dryrunResult = await algodClient.dryrun(dryrunRequest).do();
+    // resolve fails when the name has no box, which simulation reports as a
+    // failure message rather than an error
+    const { failed, logs } = await simulateCall(RESOLVE, name);
 
-    if (dryrunResult.txns.length > 0 && dryrunResult.txns[0].logs) {
-      const logs = dryrunResult.txns[0].logs;
+    if (!failed && logs.length > 0) {
       const nameData = parseResolveLogs(logs);
       
       res.json({
@@ -214,40 +250,14 @@ router.get('/:name/exists', async (req, res) => {
       return res.status(400).json({ error: 'Name parameter required' });
     }
 
-    // Create a temporary account for the read-only transaction
-    const tempAccount = algosdk.generateAccount();
-    
-    // Get suggested parameters
-    const params = await algodClient.getTransactionParams().do();
-    
-    // Create application call transaction
-    const appArgs = [
-      new Uint8Array(Buffer.from('exists')),
-      new Uint8Array(Buffer.from(name))
-    ];
-
-    const txn = algosdk.makeApplicationNoOpTxn(
-      tempAccount.addr,
-      params,
-      nameRegistryAppId,
-      appArgs
-    );
-
-    // Sign and use dryrun
-    const signedTxn = txn.signTxn(tempAccount.sk);
-    const dryrunRequest = algosdk.createDryrun(algodClient, [signedTxn]);
-    const dryrunResult = await algodClient.dryrun(dryrunRequest).do();
+    const { failed, logs } = await simulateCall(EXISTS, name);
 
+    // EXISTS:<name>:<1|0>; the flag is the final byte
     let exists = false;
-    if (dryrunResult.txns.length > 0 && dryrunResult.txns[0].logs) {
-      const logs = dryrunResult.txns[0].logs;
-      
-      for (const logBase64 of logs) {
-        const logStr = Buffer.from(logBase64, 'base64').toString();
-        
-        if (logStr.startsWith('EXISTS:')) {
-          const parts = logStr.split(':');
-          exists = parts[2] === '1';
+    if (!failed) {
+      for (const log of logs) {
+        if (log.toString('latin1').startsWith('EXISTS:')) {
+          exists = log.subarray(log.length - 1).toString() === '1';
           break;
         }
       }
@@ -6,15 +6,90 @@
 import { 
   Algodv2, 
   Indexer, 
+  ABIMethod,
+  ABIStringType,
   makeApplicationCallTxnFromObject,
   makePaymentTxnWithSuggestedParams,
   assignGroupID,
   getApplicationAddress,
   OnApplicationComplete,
+  decodeAddress,
+  decodeObj,
+  decodeSignedTransaction,
+  encodeAddress,
   encodeUint64,
+  encodeUnsignedSimulateTransaction,
+  modelsv2,
+  EncodedSignedTransaction,
   Transaction
 } from 'algosdk';
 
+// ARC-4 methods the contracts dispatch on: each call's first argument is the
+// method's 4-byte selector, strings carry a 2-byte length prefix, addresses
+// are their 32-byte public keys and uint64s are 8 bytes big-endian
+const PUBLISH_MODEL = ABIMethod.fromSignature('publish_model(string,address,string)void');
+const GET_MODEL = ABIMethod.fromSignature('get_model(uint64)void');
+const CREATE_ESCROW = ABIMethod.fromSignature('create_escrow(uint64,address,uint64)void');
+const RELEASE_PAYMENT = ABIMethod.fromSignature('release_payment(uint64)void');
+const REFUND_PAYMENT = ABIMethod.fromSignature('refund_payment(uint64)void');
+const GET_ESCROW_STATUS = ABIMethod.fromSignature('get_escrow_status(uint64)void');
+const ARC4_STRING = new ABIStringType();
+
+// Minimum balance each new box adds to its app account (2500 plus 400 per
+// byte of box name and value), paid by the caller creating the box
+const ESCROW_BOX_MBR = 2500 + 400 * (8 + 104);
+
+function modelBoxMbr(cid: string, licenseTerms: string): number {
+  const encoder = new TextEncoder();
+  return 2500 + 400 * (8 + 42 + encoder.encode(cid).length + encoder.encode(licenseTerms).length);
+}
+
+// Models and escrows are stored in boxes named by their 8-byte big-endian id
+function recordBoxRefs(id: number) {
+  return [{ appIndex: 0, name: encodeUint64(id) }];
+}
+
+// A new record's id is only known once the call runs (counter + 1), so the
+// calls creating one reference this many candidate boxes from the predicted id
+const NEW_RECORD_BOX_WINDOW = 4;
+
+function newRecordBoxRefs(predictedId: number) {
+  return Array.from({ length: NEW_RECORD_BOX_WINDOW }, (_, i) => ({
+    appIndex: 0,
+    name: encodeUint64(predictedId + i)
+  }));
+}
+
+// Contract logs are binary: fixed-width fields are raw bytes behind ASCII
+// labels. Layouts:
+//   MODEL_PUBLISHED:<id 8>:<cid>:<publisher 32>
+//   MODEL_DATA:<id 8>|PUBLISHER:<32>|TIMESTAMP:<8>|CID:<cid>|LICENSE:<terms>
+//   ESCROW_CREATED:<id 8>:<model id 8>:<buyer 32>:<amount 8>
+const MODEL_PUBLISHED_PREFIX = Buffer.from('MODEL_PUBLISHED:');
+const MODEL_DATA_PREFIX = Buffer.from('MODEL_DATA:');
+const ESCROW_CREATED_PREFIX = Buffer.from('ESCROW_CREATED:');
+const MODEL_DATA_PUBLISHER_OFFSET = 30;
+const MODEL_DATA_TIMESTAMP_OFFSET = 73;
+const MODEL_DATA_CID_OFFSET = 86;
+const MODEL_DATA_LICENSE_LABEL = '|LICENSE:';
+
+// algod and indexer return logs base64-encoded or as raw bytes depending on
+// the response format
+function logBytes(log: string | Uint8Array): Buffer {
+  return typeof log === 'string' ? Buffer.from(log, 'base64') : Buffer.from(log);
+}
+
+// The 8-byte big-endian id following a log's prefix, or 0 if no log has it
+function recordIdFromLogs(logs: (string | Uint8Array)[], prefix: Buffer): number {
+  for (const entry of logs) {
+    const log = logBytes(entry);
+    if (log.length >= prefix.length + 8 && log.subarray(0, prefix.length).equals(prefix)) {
+      return Number(log.readBigUInt64BE(prefix.length));
+    }
+  }
+  return 0;
+}
+
 export interface BlockchainConfig {
   algodToken: string;
   algodServer: string;
@@ -39,6 +114,7 @@ export interface TransactionStatus {
   txnId: string;
   block?: number;
   logs?: string[];
+  rawLogs?: (string | Uint8Array)[];
   error?: string;
 }
 
@@ -62,36 +138,56 @@ export class BlockchainService {
   }
 
   /**
-   * Build unsigned transaction for model registration
-   * Returns transaction for wallet to sign
+   * Build unsigned transaction group for model registration
+   * Returns box MBR payment + publish call for wallet to sign
    */
-  async buildModelRegistrationTransaction(
+  async buildModelRegistrationTransactions(
     publisherAddress: string,
     cid: string,
     licenseTerms: string
-  ): Promise<UnsignedTransaction> {
+  ): Promise<UnsignedTransactionGroup> {
     try {
       const params = await this.algodClient.getTransactionParams().do();
-      
-      const transaction = makeApplicationCallTxnFromObject({
+      const modelId = await this.nextRecordId(this.config.modelRegistryAppId, 'model_count');
+      const boxMbr = modelBoxMbr(cid, licenseTerms);
+
+      // Payment covering the new model box's minimum balance
+      const paymentTxn = makePaymentTxnWithSuggestedParams(
+        publisherAddress,
+        getApplicationAddress(this.config.modelRegistryAppId),
+        boxMbr,
+        undefined,
+        undefined,
+        params
+      );
+
+      const publishTxn = makeApplicationCallTxnFromObject({
         from: publisherAddress,
         suggestedParams: params,
         appIndex: this.config.modelRegistryAppId,
         onComplete: OnApplicationComplete.NoOpOC,
         appArgs: [
-          new TextEncoder().encode('publish_model'),
-          new TextEncoder().encode(cid),
-          new TextEncoder().encode(publisherAddress),
-          new TextEncoder().encode(licenseTerms)
-        ]
+          PUBLISH_MODEL.getSelector(),
+          ARC4_STRING.encode(cid),
+          decodeAddress(publisherAddress).publicKey,
+          ARC4_STRING.encode(licenseTerms)
+        ],
+        boxes: newRecordBoxRefs(modelId)
       });
 
+      // Group transactions
+      const transactions = [paymentTxn, publishTxn];
+      assignGroupID(transactions);
+
       return {
-        transaction,
-        description: `Register ML model with CID: ${cid}`
+        transactions,
+        descriptions: [
+          `Storage deposit of ${boxMbr / 1000000} ALGO for the model record`,
+          `Register ML model with CID: ${cid}`
+        ]
       };
     } catch (error) {
-      throw new Error(`Failed to build model registration transaction: ${error.message}`);
+      throw new Error(`Failed to build model registration transactions: ${error.message}`);
     }
   }
 
@@ -108,12 +204,14 @@ export class BlockchainService {
     try {
       const params = await this.algodClient.getTransactionParams().do();
       const escrowAppAddress = getApplicationAddress(this.config.escrowAppId);
+      const escrowId = await this.nextRecordId(this.config.escrowAppId, 'escrow_count');
 
-      // Payment transaction to escrow contract
+      // Payment transaction to escrow contract; the price is held in escrow
+      // and the rest covers the new escrow box's minimum balance
       const paymentTxn = makePaymentTxnWithSuggestedParams(
         buyerAddress,
         escrowAppAddress,
-        priceInMicroAlgos,
+        priceInMicroAlgos + ESCROW_BOX_MBR,
         undefined,
         new TextEncoder().encode(`Purchase model ${modelId}`),
         params
@@ -126,11 +224,12 @@ export class BlockchainService {
         appIndex: this.config.escrowAppId,
         onComplete: OnApplicationComplete.NoOpOC,
         appArgs: [
-          new TextEncoder().encode('create_escrow'),
+          CREATE_ESCROW.getSelector(),
           encodeUint64(modelId),
-          new TextEncoder().encode(publisherAddress),
+          decodeAddress(publisherAddress).publicKey,
           encodeUint64(priceInMicroAlgos)
-        ]
+        ],
+        boxes: newRecordBoxRefs(escrowId)
       });
 
       // Group transactions
@@ -140,7 +239,7 @@ export class BlockchainService {
       return {
         transactions,
         descriptions: [
-          `Payment of ${priceInMicroAlgos / 1000000} ALGO for model ${modelId}`,
+          `Payment of ${priceInMicroAlgos / 1000000} ALGO (plus ${ESCROW_BOX_MBR / 1000000} ALGO storage deposit) for model ${modelId}`,
           `Create escrow for model ${modelId} purchase`
         ]
       };
@@ -157,7 +256,7 @@ export class BlockchainService {
     escrowId: number
   ): Promise<UnsignedTransaction> {
     try {
-      const params = await this.algodClient.getTransactionParams().do();
+      const params = await this.getSettlementParams(2);
 
       const transaction = makeApplicationCallTxnFromObject({
         from: publisherAddress,
@@ -165,9 +264,10 @@ export class BlockchainService {
         appIndex: this.config.escrowAppId,
         onComplete: OnApplicationComplete.NoOpOC,
         appArgs: [
-          new TextEncoder().encode('release_payment'),
+          RELEASE_PAYMENT.getSelector(),
           encodeUint64(escrowId)
-        ]
+        ],
+        boxes: recordBoxRefs(escrowId)
       });
 
       return {
@@ -187,7 +287,7 @@ export class BlockchainService {
     escrowId: number
   ): Promise<UnsignedTransaction> {
     try {
-      const params = await this.algodClient.getTransactionParams().do();
+      const params = await this.getSettlementParams(1);
 
       const transaction = makeApplicationCallTxnFromObject({
         from: buyerAddress,
@@ -195,9 +295,10 @@ export class BlockchainService {
         appIndex: this.config.escrowAppId,
         onComplete: OnApplicationComplete.NoOpOC,
         appArgs: [
-          new TextEncoder().encode('refund_payment'),
+          REFUND_PAYMENT.getSelector(),
           encodeUint64(escrowId)
-        ]
+        ],
+        boxes: recordBoxRefs(escrowId)
       });
 
       return {
@@ -223,16 +324,26 @@ export class BlockchainService {
 
   /**
    * Submit signed transaction group to the network
+   * Returns the id of the group's last transaction, the app call whose logs
+   * callers read
    */
   async submitSignedTransactionGroup(signedTransactions: Uint8Array[]): Promise<string> {
     try {
-      const result = await this.algodClient.sendRawTransaction(signedTransactions).do();
-      return result.txId;
+      await this.algodClient.sendRawTransaction(signedTransactions).do();
+      return decodeSignedTransaction(signedTransactions[signedTransactions.length - 1]).txn.txID();
     } catch (error) {
       throw new Error(`Failed to submit transaction group: ${error.message}`);
     }
   }
 
+  /**
+   * Whether a submission failed because the new record's id moved past the
+   * box references predicted by nextRecordId
+   */
+  isStaleRecordBoxError(error: Error): boolean {
+    return /invalid box reference/i.test(error.message);
+  }
+
   /**
    * Get model information by calling the smart contract
    */
@@ -246,13 +357,22 @@ export class BlockchainService {
         appIndex: this.config.modelRegistryAppId,
         onComplete: OnApplicationComplete.NoOpOC,
         appArgs: [
-          new TextEncoder().encode('get_model'),
+          GET_MODEL.getSelector(),
           encodeUint64(modelId)
-        ]
+        ],
+        boxes: recordBoxRefs(modelId)
       });
 
-      // This would need to be signed and submitted, then logs parsed
-      // For now, we'll use the indexer to get historical data
+      // get_model only reads state, so it is simulated unsigned rather than
+      // submitted; the indexer is the fallback where simulation is unavailable
+      try {
+        const modelData = this.parseModelLogs(await this.simulateLogs(transaction));
+        if (modelData) {
+          return modelData;
+        }
+      } catch (error) {
+        console.warn(`Simulating get_model ${modelId} failed, falling back to indexer:`, error.message);
+      }
       return this.getModelFromIndexer(modelId);
     } catch (error) {
       console.error(`Failed to get model ${modelId}:`, error);
@@ -275,11 +395,8 @@ export class BlockchainService {
 
       // Find the transaction that published this model
       for (const txn of txnQuery.transactions) {
-        if (txn.logs) {
-          const modelData = this.parseModelLogs(txn.logs);
-          if (modelData && modelData.id === modelId) {
-            return modelData;
-          }
+        if (txn.logs && recordIdFromLogs(txn.logs, MODEL_PUBLISHED_PREFIX) === modelId) {
+          return this.parsePublishTransaction(modelId, txn);
         }
       }
 
@@ -292,6 +409,8 @@ export class BlockchainService {
 
   /**
    * Get escrow status by calling the smart contract
+   * get_escrow_status fails once an escrow is settled, since settlement
+   * deletes its box
    */
   async getEscrowStatus(escrowId: number, callerAddress: string): Promise<any> {
     try {
@@ -303,9 +422,10 @@ export class BlockchainService {
         appIndex: this.config.escrowAppId,
         onComplete: OnApplicationComplete.NoOpOC,
         appArgs: [
-          new TextEncoder().encode('get_escrow_status'),
+          GET_ESCROW_STATUS.getSelector(),
           encodeUint64(escrowId)
-        ]
+        ],
+        boxes: recordBoxRefs(escrowId)
       });
 
       // This would need to be signed and submitted, then logs parsed
@@ -332,7 +452,8 @@ export class BlockchainService {
             confirmed: true,
             txnId,
             block: txnInfo['confirmed-round'],
-            logs: this.decodeLogs(txnInfo.logs || [])
+            logs: this.decodeLogs(txnInfo.logs || []),
+            rawLogs: txnInfo.logs || []
           };
         }
       } catch (error) {
@@ -399,6 +520,32 @@ export class BlockchainService {
     }
   }
 
+  /**
+   * Id the next model or escrow will get: one past the app's global counter.
+   * This is only a prediction: a publish or purchase confirmed between
+   * building and submitting a transaction takes the id. The window of
+   * references from newRecordBoxRefs absorbs a few such races; past that the
+   * call fails with an invalid box reference (see isStaleRecordBoxError) and
+   * must be built again against the re-read counter.
+   */
+  private async nextRecordId(appId: number, counterKey: string): Promise<number> {
+    const app = await this.algodClient.getApplicationByID(appId).do();
+    const counter = (app.params['global-state'] || []).find(
+      (entry: any) => Buffer.from(entry.key, 'base64').toString() === counterKey
+    );
+    return (counter ? counter.value.uint : 0) + 1;
+  }
+
+  /**
+   * Suggested params for release/refund calls, whose fee also covers the
+   * contract's inner payments (fee pooling): release pays the publisher and
+   * returns the box deposit to the buyer, refund makes one payment to the buyer
+   */
+  private async getSettlementParams(innerPayments: number): Promise<any> {
+    const params = await this.algodClient.getTransactionParams().do();
+    return { ...params, flatFee: true, fee: (1 + innerPayments) * (params.minFee || 1000) };
+  }
+
   /**
    * Decode logs from base64
    */
@@ -413,37 +560,51 @@ export class BlockchainService {
   }
 
   /**
-   * Parse model logs to extract model data
+   * Evaluate a read-only app call against current ledger state without
+   * signing or submitting it, returning its logs
    */
-  private parseModelLogs(logs: string[]): ModelData | null {
+  private async simulateLogs(transaction: Transaction): Promise<Uint8Array[]> {
+    const request = new modelsv2.SimulateRequest({
+      txnGroups: [
+        new modelsv2.SimulateRequestTransactionGroup({
+          txns: [decodeObj(encodeUnsignedSimulateTransaction(transaction)) as EncodedSignedTransaction]
+        })
+      ],
+      allowEmptySignatures: true
+    });
+    const result = await this.algodClient.simulateTransactions(request).do();
+
+    const group = result.txnGroups[0];
+    if (group.failureMessage) {
+      throw new Error(`Simulation failed: ${group.failureMessage}`);
+    }
+    return group.txnResults[0].txnResult.logs || [];
+  }
+
+  /**
+   * Parse the get_model MODEL_DATA log to extract model data
+   */
+  private parseModelLogs(logs: (string | Uint8Array)[]): ModelData | null {
     try {
-      const decodedLogs = this.decodeLogs(logs);
-      
-      let id = 0;
-      let cid = '';
-      let publisher = '';
-      let licenseTerms = '';
-      let timestamp = 0;
-
-      for (const log of decodedLogs) {
-        if (log.startsWith('MODEL_PUBLISHED:')) {
-          const parts = log.split(':');
-          if (parts.length >= 2) {
-            id = parseInt(parts[1]);
-          }
-        } else if (log.startsWith('CID:')) {
-          cid = log.substring(4);
-        } else if (log.startsWith('PUBLISHER:')) {
-          publisher = log.substring(10);
-        } else if (log.startsWith('LICENSE:')) {
-          licenseTerms = log.substring(8);
-        } else if (log.startsWith('TIMESTAMP:')) {
-          timestamp = parseInt(log.substring(10));
+      for (const entry of logs) {
+        const log = logBytes(entry);
+        if (!log.subarray(0, MODEL_DATA_PREFIX.length).equals(MODEL_DATA_PREFIX)) {
+          continue;
         }
-      }
 
-      if (id && cid && publisher && licenseTerms) {
-        return { id, cid, publisher, licenseTerms, timestamp };
+        // The CID is variable-length and runs up to the license label
+        const licenseAt = log.indexOf(MODEL_DATA_LICENSE_LABEL, MODEL_DATA_CID_OFFSET);
+        if (licenseAt < 0) {
+          return null;
+        }
+
+        return {
+          id: Number(log.readBigUInt64BE(MODEL_DATA_PREFIX.length)),
+          publisher: encodeAddress(log.subarray(MODEL_DATA_PUBLISHER_OFFSET, MODEL_DATA_PUBLISHER_OFFSET + 32)),
+          timestamp: Number(log.readBigUInt64BE(MODEL_DATA_TIMESTAMP_OFFSET)),
+          cid: log.subarray(MODEL_DATA_CID_OFFSET, licenseAt).toString(),
+          licenseTerms: log.subarray(licenseAt + MODEL_DATA_LICENSE_LABEL.length).toString()
+        };
       }
 
       return null;
@@ -453,6 +614,47 @@ export class BlockchainService {
     }
   }
 
+  /**
+   * Rebuild model data from the indexer record of its publish_model call:
+   * the MODEL_PUBLISHED log carries the CID and publisher, the ARC-4
+   * license argument the terms, and the block time the timestamp
+   */
+  private parsePublishTransaction(modelId: number, txn: any): ModelData | null {
+    try {
+      const log = txn.logs.map(logBytes).find(
+        (entry: Buffer) => entry.subarray(0, MODEL_PUBLISHED_PREFIX.length).equals(MODEL_PUBLISHED_PREFIX)
+      );
+      const cidStart = MODEL_PUBLISHED_PREFIX.length + 9;
+      const publisherStart = log.length - 32;
+      const licenseArg = Buffer.from(txn['application-transaction']['application-args'][3], 'base64');
+
+      return {
+        id: modelId,
+        cid: log.subarray(cidStart, publisherStart - 1).toString(),
+        publisher: encodeAddress(log.subarray(publisherStart)),
+        licenseTerms: licenseArg.subarray(2).toString(),
+        timestamp: txn['round-time']
+      };
+    } catch (error) {
+      console.error('Failed to parse publish transaction:', error);
+      return null;
+    }
+  }
+
+  /**
+   * Id of the model created by a confirmed publish_model call, or 0
+   */
+  extractModelId(logs: (string | Uint8Array)[]): number {
+    return recordIdFromLogs(logs, MODEL_PUBLISHED_PREFIX);
+  }
+
+  /**
+   * Id of the escrow created by a confirmed create_escrow call, or 0
+   */
+  extractEscrowId(logs: (string | Uint8Array)[]): number {
+    return recordIdFromLogs(logs, ESCROW_CREATED_PREFIX);
+  }
+
   /**
    * Validate Algorand address
    */
@@ -11,249 +11,247 @@ def approval_program():
     # Global state keys
     escrow_count_key = Bytes("escrow_count")
     
-    # Helper function to get escrow-specific keys
-    def escrow_key(escrow_id: Expr, suffix: bytes) -> Expr:
-        return Concat(Bytes(suffix), Itob(escrow_id))
-    
     # Escrow status constants
     STATUS_PENDING = Int(0)
-    STATUS_RELEASED = Int(1)
-    STATUS_REFUNDED = Int(2)
     
-    # Initialize application
-    on_creation = Seq([
-        App.globalPut(escrow_count_key, Int(0)),
-        Return(Int(1))
-    ])
+    # Each escrow is stored as a packed record in a box named by the 8-byte
+    # big-endian escrow id (the ARC-4 uint64 encoding callers already send):
+    # model_id(8) | amount(8) | status(8) | settled(8) | created(8) | buyer(32) | publisher(32)
+    # Settlement deletes the box, so a stored record is always pending; the
+    # status and settled fields keep the record at a fixed 104 bytes
+    MODEL_ID_OFFSET = Int(0)
+    AMOUNT_OFFSET = Int(8)
+    STATUS_OFFSET = Int(16)
+    SETTLED_OFFSET = Int(24)
+    CREATED_OFFSET = Int(32)
+    BUYER_OFFSET = Int(40)
+    PUBLISHER_OFFSET = Int(72)
+    
+    # Minimum balance the new box adds to the app account (2500 + 400 per
+    # byte of key and value); the buyer pays it on top of the price and gets
+    # it back when settlement deletes the box
+    ESCROW_BOX_MBR = Int(2500 + 400 * (8 + 104))
+    
+    # Scratch slots caching values reused within a single method call
+    count = ScratchVar(TealType.uint64)
+    record = ScratchVar(TealType.bytes)
+    amount = ScratchVar(TealType.uint64)
+    publisher = ScratchVar(TealType.bytes)
+    buyer = ScratchVar(TealType.bytes)
+    
+    # Helper function to load an existing escrow record into scratch
+    def load_record(escrow_id_bytes: Expr) -> Expr:
+        contents = App.box_get(escrow_id_bytes)
+        return Seq([
+            contents,
+            Assert(contents.hasValue()),
+            record.store(contents.value())
+        ])
+    
+    # Shared range check for the methods taking an escrow id; as a subroutine
+    # it is emitted once instead of once per method
+    @Subroutine(TealType.none)
+    def validate_escrow_id(escrow_id: Expr) -> Expr:
+        return Seq([
+            Assert(escrow_id > Int(0)),
+            Assert(escrow_id <= App.globalGet(escrow_count_key))
+        ])
+    
+    # Creation initializes the counter; opt-in and close-out are accepted and
+    # every other bare call (update, delete) is rejected by the router
+    router = Router(
+        "Escrow",
+        BareCallActions(
+            no_op=OnCompleteAction.create_only(App.globalPut(escrow_count_key, Int(0))),
+            opt_in=OnCompleteAction.always(Approve()),
+            close_out=OnCompleteAction.always(Approve())
+        )
+    )
     
     # Create escrow method
-    create_escrow = Seq([
-        # Validate inputs
-        Assert(Txn.application_args.length() == Int(4)),  # method + 3 params
-        Assert(Global.group_size() == Int(2)),  # Payment + App call
-        Assert(Gtxn[0].type_enum() == TxnType.Payment),  # First txn is payment
-        Assert(Gtxn[1].type_enum() == TxnType.ApplicationCall),  # Second is app call
-        
-        # Validate payment is to this contract
-        Assert(Gtxn[0].receiver() == Global.current_application_address()),
-        Assert(Gtxn[0].amount() > Int(0)),
-        
-        # Validate payment amount matches the specified price
-        Assert(Gtxn[0].amount() == Btoi(Txn.application_args[3])),  # Price argument
-        
-        # Increment escrow count
-        App.globalPut(escrow_count_key, App.globalGet(escrow_count_key) + Int(1)),
-        
-        # Store escrow data using the new escrow ID
-        App.globalPut(
-            escrow_key(App.globalGet(escrow_count_key), b"model_"), 
-            Btoi(Txn.application_args[1])
-        ),
-        App.globalPut(
-            escrow_key(App.globalGet(escrow_count_key), b"buyer_"), 
-            Gtxn[0].sender()
-        ),
-        App.globalPut(
-            escrow_key(App.globalGet(escrow_count_key), b"publisher_"), 
-            Txn.application_args[2]
-        ),
-        App.globalPut(
-            escrow_key(App.globalGet(escrow_count_key), b"amount_"), 
-            Gtxn[0].amount()
-        ),
-        App.globalPut(
-            escrow_key(App.globalGet(escrow_count_key), b"status_"), 
-            STATUS_PENDING
-        ),
-        App.globalPut(
-            escrow_key(App.globalGet(escrow_count_key), b"created_"), 
-            Itob(Global.latest_timestamp())
-        ),
-        
-        # Log escrow creation
-        Log(Concat(
-            Bytes("ESCROW_CREATED:"),
-            Itob(App.globalGet(escrow_count_key)),
-            Bytes(":"),
-            Txn.application_args[1],
-            Bytes(":"),
-            Gtxn[0].sender(),
-            Bytes(":"),
-            Itob(Gtxn[0].amount())
-        )),
-        
-        Return(Int(1))
-    ])
+    @router.method(no_op=CallConfig.CALL)
+    def create_escrow(model_id: abi.Uint64, publisher: abi.Address, price: abi.Uint64) -> Expr:
+        return Seq([
+            # Validate inputs
+            Assert(Len(publisher.get()) == Int(32)),  # Publisher address
+            Assert(Global.group_size() == Int(2)),  # Payment + App call
+            Assert(Gtxn[0].type_enum() == TxnType.Payment),  # First txn is payment
+            Assert(Gtxn[1].type_enum() == TxnType.ApplicationCall),  # Second is app call
+            
+            # Validate payment is to this contract
+            Assert(Gtxn[0].receiver() == Global.current_application_address()),
+            
+            # Read the payment fields once; later uses load from scratch
+            amount.store(price.get()),
+            buyer.store(Gtxn[0].sender()),
+            Assert(amount.load() > Int(0)),
+            
+            # Validate the payment covers the price plus the escrow box MBR;
+            # the price is held for the publisher and the MBR is returned to
+            # the buyer when the escrow is settled
+            Assert(Gtxn[0].amount() == amount.load() + ESCROW_BOX_MBR),
+            
+            # Increment escrow count
+            count.store(App.globalGet(escrow_count_key) + Int(1)),
+            App.globalPut(escrow_count_key, count.load()),
+            
+            # Store escrow data using the new escrow ID
+            App.box_put(
+                Itob(count.load()),
+                Concat(
+                    model_id.encode(),  # model_id
+                    Itob(amount.load()),  # amount
+                    Itob(STATUS_PENDING),  # status
+                    Itob(Int(0)),  # settled
+                    Itob(Global.latest_timestamp()),  # created
+                    buyer.load(),  # buyer
+                    publisher.get()  # publisher
+                )
+            ),
+            
+            # Log escrow creation
+            Log(Concat(
+                Bytes("ESCROW_CREATED:"),
+                Itob(count.load()),
+                Bytes(":"),
+                model_id.encode(),
+                Bytes(":"),
+                buyer.load(),
+                Bytes(":"),
+                Itob(amount.load())
+            ))
+        ])
     
     # Release payment method
-    release_payment = Seq([
-        # Validate inputs
-        Assert(Txn.application_args.length() == Int(2)),
-        Assert(Btoi(Txn.application_args[1]) > Int(0)),
-        Assert(Btoi(Txn.application_args[1]) <= App.globalGet(escrow_count_key)),
-        
-        # Validate escrow state and permissions
-        Assert(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"status_")) == STATUS_PENDING),
-        Assert(Txn.sender() == App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"publisher_"))),
-        Assert(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"amount_")) > Int(0)),
-        
-        # Update status first (prevent reentrancy)
-        App.globalPut(
-            escrow_key(Btoi(Txn.application_args[1]), b"status_"), 
-            STATUS_RELEASED
-        ),
-        App.globalPut(
-            escrow_key(Btoi(Txn.application_args[1]), b"released_"), 
-            Itob(Global.latest_timestamp())
-        ),
-        
-        # Send payment to publisher
-        InnerTxnBuilder.Begin(),
-        InnerTxnBuilder.SetFields({
-            TxnField.type_enum: TxnType.Payment,
-            TxnField.receiver: App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"publisher_")),
-            TxnField.amount: App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"amount_")) - Int(1000),
-            TxnField.fee: Int(0)
-        }),
-        InnerTxnBuilder.Submit(),
-        
-        # Log payment release
-        Log(Concat(
-            Bytes("PAYMENT_RELEASED:"),
-            Txn.application_args[1],
-            Bytes(":"),
-            App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"publisher_")),
-            Bytes(":"),
-            Itob(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"amount_")))
-        )),
-        
-        Return(Int(1))
-    ])
+    @router.method(no_op=CallConfig.CALL)
+    def release_payment(escrow_id: abi.Uint64) -> Expr:
+        return Seq([
+            # Validate inputs
+            validate_escrow_id(escrow_id.get()),
+            
+            # Load escrow state once; the raw ARC-4 argument is already the
+            # 8-byte box name, so it is used as-is rather than re-encoded
+            load_record(Txn.application_args[1]),
+            publisher.store(Extract(record.load(), PUBLISHER_OFFSET, Int(32))),
+            buyer.store(Extract(record.load(), BUYER_OFFSET, Int(32))),
+            amount.store(ExtractUint64(record.load(), AMOUNT_OFFSET)),
+            
+            # Validate escrow state and permissions
+            Assert(Txn.sender() == publisher.load()),
+            Assert(amount.load() > Int(0)),
+            
+            # Delete the record first so the escrow cannot be settled twice;
+            # this frees the box's minimum balance
+            Pop(App.box_delete(Txn.application_args[1])),
+            
+            # Send payment to publisher and return the box MBR to the buyer
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.receiver: publisher.load(),
+                TxnField.amount: amount.load(),
+                TxnField.fee: Int(0)  # covered by the outer call via fee pooling
+            }),
+            InnerTxnBuilder.Next(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.receiver: buyer.load(),
+                TxnField.amount: ESCROW_BOX_MBR,
+                TxnField.fee: Int(0)  # covered by the outer call via fee pooling
+            }),
+            InnerTxnBuilder.Submit(),
+            
+            # Log payment release
+            Log(Concat(
+                Bytes("PAYMENT_RELEASED:"),
+                Txn.application_args[1],
+                Bytes(":"),
+                publisher.load(),
+                Bytes(":"),
+                Itob(amount.load())
+            ))
+        ])
     
     # Refund payment method
-    refund_payment = Seq([
-        # Validate inputs
-        Assert(Txn.application_args.length() == Int(2)),
-        Assert(Btoi(Txn.application_args[1]) > Int(0)),
-        Assert(Btoi(Txn.application_args[1]) <= App.globalGet(escrow_count_key)),
-        
-        # Validate escrow state
-        Assert(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"status_")) == STATUS_PENDING),
-        Assert(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"amount_")) > Int(0)),
-        
-        # Validate permissions (buyer can refund, or anyone after 7 days)
-        Assert(
-            Or(
-                Txn.sender() == App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"buyer_")),
-                Global.latest_timestamp() > Btoi(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"created_"))) + Int(604800)
-            )
-        ),
-        
-        # Update status first (prevent reentrancy)
-        App.globalPut(
-            escrow_key(Btoi(Txn.application_args[1]), b"status_"), 
-            STATUS_REFUNDED
-        ),
-        App.globalPut(
-            escrow_key(Btoi(Txn.application_args[1]), b"refunded_"), 
-            Itob(Global.latest_timestamp())
-        ),
-        
-        # Send refund to buyer
-        InnerTxnBuilder.Begin(),
-        InnerTxnBuilder.SetFields({
-            TxnField.type_enum: TxnType.Payment,
-            TxnField.receiver: App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"buyer_")),
-            TxnField.amount: App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"amount_")) - Int(1000),
-            TxnField.fee: Int(0)
-        }),
-        InnerTxnBuilder.Submit(),
-        
-        # Log refund
-        Log(Concat(
-            Bytes("PAYMENT_REFUNDED:"),
-            Txn.application_args[1],
-            Bytes(":"),
-            App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"buyer_")),
-            Bytes(":"),
-            Itob(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"amount_")))
-        )),
-        
-        Return(Int(1))
-    ])
+    @router.method(no_op=CallConfig.CALL)
+    def refund_payment(escrow_id: abi.Uint64) -> Expr:
+        return Seq([
+            # Validate inputs
+            validate_escrow_id(escrow_id.get()),
+            
+            # Load escrow state once; the raw ARC-4 argument is already the
+            # 8-byte box name, so it is used as-is rather than re-encoded
+            load_record(Txn.application_args[1]),
+            buyer.store(Extract(record.load(), BUYER_OFFSET, Int(32))),
+            amount.store(ExtractUint64(record.load(), AMOUNT_OFFSET)),
+            
+            # Validate escrow state
+            Assert(amount.load() > Int(0)),
+            
+            # Validate permissions (buyer can refund, or anyone after 7 days)
+            Assert(
+                Or(
+                    Txn.sender() == buyer.load(),
+                    Global.latest_timestamp() > ExtractUint64(record.load(), CREATED_OFFSET) + Int(604800)
+                )
+            ),
+            
+            # Delete the record first so the escrow cannot be settled twice;
+            # this frees the box's minimum balance
+            Pop(App.box_delete(Txn.application_args[1])),
+            
+            # Send refund to buyer, together with the box MBR they deposited
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.receiver: buyer.load(),
+                TxnField.amount: amount.load() + ESCROW_BOX_MBR,
+                TxnField.fee: Int(0)  # covered by the outer call via fee pooling
+            }),
+            InnerTxnBuilder.Submit(),
+            
+            # Log refund
+            Log(Concat(
+                Bytes("PAYMENT_REFUNDED:"),
+                Txn.application_args[1],
+                Bytes(":"),
+                buyer.load(),
+                Bytes(":"),
+                Itob(amount.load())
+            ))
+        ])
     
     # Get escrow status method
-    get_escrow_status = Seq([
-        # Validate inputs
-        Assert(Txn.application_args.length() == Int(2)),
-        Assert(Btoi(Txn.application_args[1]) > Int(0)),
-        Assert(Btoi(Txn.application_args[1]) <= App.globalGet(escrow_count_key)),
-        
-        # Return data via structured logs
-        Log(Concat(Bytes("ESCROW_STATUS:"), Txn.application_args[1])),
-        Log(Concat(Bytes("MODEL_ID:"), Itob(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"model_"))))),
-        Log(Concat(Bytes("BUYER:"), App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"buyer_")))),
-        Log(Concat(Bytes("PUBLISHER:"), App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"publisher_")))),
-        Log(Concat(Bytes("AMOUNT:"), Itob(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"amount_"))))),
-        Log(Concat(Bytes("STATUS:"), Itob(App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"status_"))))),
-        Log(Concat(Bytes("CREATED:"), App.globalGet(escrow_key(Btoi(Txn.application_args[1]), b"created_")))),
-        
-        Return(Int(1))
-    ])
+    @router.method(no_op=CallConfig.CALL)
+    def get_escrow_status(escrow_id: abi.Uint64) -> Expr:
+        return Seq([
+            # Validate inputs
+            validate_escrow_id(escrow_id.get()),
+            
+            load_record(Txn.application_args[1]),
+            
+            # Return data via a single structured log; every field is fixed-width
+            Log(Concat(
+                Bytes("ESCROW_STATUS:"), Txn.application_args[1],
+                Bytes("|MODEL_ID:"), Extract(record.load(), MODEL_ID_OFFSET, Int(8)),
+                Bytes("|BUYER:"), Extract(record.load(), BUYER_OFFSET, Int(32)),
+                Bytes("|PUBLISHER:"), Extract(record.load(), PUBLISHER_OFFSET, Int(32)),
+                Bytes("|AMOUNT:"), Extract(record.load(), AMOUNT_OFFSET, Int(8)),
+                Bytes("|STATUS:"), Extract(record.load(), STATUS_OFFSET, Int(8)),
+                Bytes("|CREATED:"), Extract(record.load(), CREATED_OFFSET, Int(8))
+            ))
+        ])
     
     # Get escrow count method
-    get_escrow_count = Seq([
-        Log(Concat(Bytes("ESCROW_COUNT:"), Itob(App.globalGet(escrow_count_key)))),
-        Return(Int(1))
-    ])
-    
-    # Main program logic
-    program = Cond(
-        # Application creation
-        [Txn.application_id() == Int(0), on_creation],
-        
-        # Method calls
-        [And(
-            Txn.on_completion() == OnComplete.NoOp,
-            Txn.application_args.length() >= Int(1),
-            Txn.application_args[0] == Bytes("create_escrow")
-        ), create_escrow],
-        
-        [And(
-            Txn.on_completion() == OnComplete.NoOp,
-            Txn.application_args.length() >= Int(1),
-            Txn.application_args[0] == Bytes("release_payment")
-        ), release_payment],
-        
-        [And(
-            Txn.on_completion() == OnComplete.NoOp,
-            Txn.application_args.length() >= Int(1),
-            Txn.application_args[0] == Bytes("refund_payment")
-        ), refund_payment],
-        
-        [And(
-            Txn.on_completion() == OnComplete.NoOp,
-            Txn.application_args.length() >= Int(1),
-            Txn.application_args[0] == Bytes("get_escrow_status")
-        ), get_escrow_status],
-        
-        [And(
-            Txn.on_completion() == OnComplete.NoOp,
-            Txn.application_args.length() >= Int(1),
-            Txn.application_args[0] == Bytes("get_escrow_count")
-        ), get_escrow_count],
-        
-        # Other transaction types
-        [Txn.on_completion() == OnComplete.OptIn, Return(Int(1))],
-        [Txn.on_completion() == OnComplete.CloseOut, Return(Int(1))],
-        [Txn.on_completion() == OnComplete.UpdateApplication, Return(Int(0))],
-        [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
-        
-        # Default: reject
-        [Int(1), Return(Int(0))]
-    )
+    @router.method(no_op=CallConfig.CALL)
+    def get_escrow_count() -> Expr:
+        return Seq([
+            Log(Concat(Bytes("ESCROW_COUNT:"), Itob(App.globalGet(escrow_count_key))))
+        ])
     
-    return program
+    # Method calls are dispatched by the router on their ARC-4 selector
+    approval, _, _ = router.build_program()
+    return approval
 
 def clear_state_program():
     """Clear state program"""
@@ -262,19 +260,21 @@ def clear_state_program():
 # ABI specification for client generation
 ABI_SPEC = {
     "name": "Escrow",
-    "description": "Smart contract for managing payment escrow in model purchases",
+    "description": "Smart contract for managing payment escrow in model purchases. Each escrow is stored in a box named by its 8-byte big-endian id, which calls must include in their box references. Settlement deletes the box and returns its 47300 microAlgo minimum balance to the buyer.",
     "methods": [
         {
             "name": "create_escrow",
+            "desc": "Must be grouped after a payment to the app of price + 47300 microAlgos; the extra 47300 covers the minimum balance of the new escrow box",
             "args": [
                 {"type": "uint64", "name": "model_id", "desc": "Model ID being purchased"},
                 {"type": "address", "name": "publisher", "desc": "Publisher address"},
                 {"type": "uint64", "name": "price", "desc": "Price in microAlgos"}
             ],
-            "returns": {"type": "void", "desc": "Escrow created with payment"}
+            "returns": {"type": "void", "desc": "Escrow created with payment; the new escrow id is escrow_count + 1"}
         },
         {
             "name": "release_payment",
+            "desc": "Sends the full escrow amount to the publisher and the 47300 microAlgo box deposit back to the buyer, then deletes the escrow box; the outer app call must pay 3x the minimum fee to cover both inner payments (fee pooling)",
             "args": [
                 {"type": "uint64", "name": "escrow_id", "desc": "Escrow ID to release"}
             ],
@@ -282,6 +282,7 @@ ABI_SPEC = {
         },
         {
             "name": "refund_payment",
+            "desc": "Sends the full escrow amount plus the 47300 microAlgo box deposit to the buyer, then deletes the escrow box; the outer app call must pay 2x the minimum fee to cover the inner payment (fee pooling)",
             "args": [
                 {"type": "uint64", "name": "escrow_id", "desc": "Escrow ID to refund"}
             ],
@@ -289,10 +290,11 @@ ABI_SPEC = {
         },
         {
             "name": "get_escrow_status",
+            "desc": "Fails for settled escrows, whose boxes are deleted; the PAYMENT_RELEASED/PAYMENT_REFUNDED logs record settlement",
             "args": [
                 {"type": "uint64", "name": "escrow_id", "desc": "Escrow ID to check"}
             ],
-            "returns": {"type": "void", "desc": "Escrow details returned via logs"}
+            "returns": {"type": "void", "desc": "Escrow details returned via a single log: ESCROW_STATUS:<id>|MODEL_ID:<8>|BUYER:<32>|PUBLISHER:<32>|AMOUNT:<8>|STATUS:<8>|CREATED:<8>"}
         },
         {
             "name": "get_escrow_count",
@@ -304,15 +306,26 @@ ABI_SPEC = {
 
 if __name__ == "__main__":
     import json
+    from algosdk import abi as sdk_abi
+    from _teal_cache import compile_teal_cached
+    
+    # Compile the contracts (version 8 is the highest the pinned PyTeal supports);
+    # unchanged sources are served from .teal_cache/
+    optimize = OptimizeOptions(scratch_slots=True)
     
-    # Compile the contracts
     with open("escrow_approval.teal", "w") as f:
-        f.write(compileTeal(approval_program(), Mode.Application, version=8))
+        f.write(compile_teal_cached(approval_program, version=8,
+                                    assembleConstants=True, optimize=optimize))
     
     with open("escrow_clear.teal", "w") as f:
-        f.write(compileTeal(clear_state_program(), Mode.Application, version=8))
+        f.write(compile_teal_cached(clear_state_program, version=8,
+                                    assembleConstants=True, optimize=optimize))
+    
+    # Write ABI specification, recording each method's 4-byte ARC-4 selector
+    # (the value the approval program dispatches on) for client reference
+    for method in ABI_SPEC["methods"]:
+        method["selector"] = sdk_abi.Method.undictify(method).get_selector().hex()
     
-    # Write ABI specification
     with open("escrow.json", "w") as f:
         json.dump(ABI_SPEC, f, indent=2)
     
@@ -11,139 +11,137 @@ def approval_program():
     # Global state keys
     model_count_key = Bytes("model_count")
     
-    # Helper function to get model key
-    def model_key(model_id: Expr, suffix: bytes) -> Expr:
-        return Concat(Bytes(suffix), Itob(model_id))
+    # Each model is stored as a packed record in a box named by the 8-byte
+    # big-endian model id (the ARC-4 uint64 encoding callers already send):
+    # publisher(32) | timestamp(8) | cid_length(2) | cid | license_terms
+    PUBLISHER_OFFSET = Int(0)
+    TIMESTAMP_OFFSET = Int(32)
+    CID_LENGTH_OFFSET = Int(40)
+    CID_OFFSET = Int(42)
     
-    # Initialize application
-    on_creation = Seq([
-        App.globalPut(model_count_key, Int(0)),
-        Return(Int(1))
-    ])
+    # Minimum balance a new model box adds to the app account: 2500 plus 400
+    # per byte of the 8-byte key and the record value
+    def model_box_mbr(cid: abi.String, license_terms: abi.String) -> Expr:
+        return Int(2500) + Int(400) * (Int(8) + CID_OFFSET + cid.length() + license_terms.length())
+    
+    # Scratch slots caching values reused within a single method call
+    new_id = ScratchVar(TealType.uint64)
+    record = ScratchVar(TealType.bytes)
+    cid_length = ScratchVar(TealType.uint64)
+    
+    # Helper function to load an existing model record into scratch
+    def load_record(model_id_bytes: Expr) -> Expr:
+        contents = App.box_get(model_id_bytes)
+        return Seq([
+            contents,
+            Assert(contents.hasValue()),
+            record.store(contents.value())
+        ])
+    
+    # Creation initializes the counter; opt-in and close-out are accepted and
+    # every other bare call (update, delete) is rejected by the router
+    router = Router(
+        "ModelRegistry",
+        BareCallActions(
+            no_op=OnCompleteAction.create_only(App.globalPut(model_count_key, Int(0))),
+            opt_in=OnCompleteAction.always(Approve()),
+            close_out=OnCompleteAction.always(Approve())
+        )
+    )
     
     # Publish model method
-    publish_model = Seq([
-        # Validate input arguments
-        Assert(Txn.application_args.length() == Int(4)),  # method + 3 params
-        Assert(Len(Txn.application_args[1]) > Int(0)),    # CID not empty
-        Assert(Len(Txn.application_args[3]) > Int(0)),    # License terms not empty
-        
-        # Get current count and increment
-        App.globalPut(model_count_key, App.globalGet(model_count_key) + Int(1)),
-        
-        # Store model data using the new model ID
-        App.globalPut(
-            model_key(App.globalGet(model_count_key), b"cid_"), 
-            Txn.application_args[1]
-        ),
-        App.globalPut(
-            model_key(App.globalGet(model_count_key), b"pub_"), 
-            Txn.application_args[2]
-        ),
-        App.globalPut(
-            model_key(App.globalGet(model_count_key), b"lic_"), 
-            Txn.application_args[3]
-        ),
-        App.globalPut(
-            model_key(App.globalGet(model_count_key), b"ts_"), 
-            Itob(Global.latest_timestamp())
-        ),
-        
-        # Log the publication event
-        Log(Concat(
-            Bytes("MODEL_PUBLISHED:"),
-            Itob(App.globalGet(model_count_key)),
-            Bytes(":"),
-            Txn.application_args[1],
-            Bytes(":"),
-            Txn.application_args[2]
-        )),
-        
-        Return(Int(1))
-    ])
+    @router.method(no_op=CallConfig.CALL)
+    def publish_model(cid: abi.String, publisher: abi.Address, license_terms: abi.String) -> Expr:
+        return Seq([
+            # Validate input arguments
+            Assert(cid.length() > Int(0)),    # CID not empty
+            Assert(cid.length() == Len(cid.get())),  # CID length prefix is accurate
+            Assert(Len(publisher.get()) == Int(32)),  # Publisher address
+            Assert(license_terms.length() > Int(0)),    # License terms not empty
+            
+            # The payment immediately before this call must cover the MBR of
+            # the box being created, so publishers fund their own storage
+            Assert(Txn.group_index() > Int(0)),
+            Assert(Gtxn[Txn.group_index() - Int(1)].type_enum() == TxnType.Payment),
+            Assert(Gtxn[Txn.group_index() - Int(1)].receiver() == Global.current_application_address()),
+            Assert(Gtxn[Txn.group_index() - Int(1)].amount() >= model_box_mbr(cid, license_terms)),
+            
+            # Get current count and increment
+            new_id.store(App.globalGet(model_count_key) + Int(1)),
+            App.globalPut(model_count_key, new_id.load()),
+            
+            # Store model data using the new model ID
+            App.box_put(
+                Itob(new_id.load()),
+                Concat(
+                    publisher.get(),  # publisher
+                    Itob(Global.latest_timestamp()),  # timestamp
+                    cid.encode(),  # cid with its ARC-4 length prefix
+                    license_terms.get()  # license terms
+                )
+            ),
+            
+            # Log the publication event
+            Log(Concat(
+                Bytes("MODEL_PUBLISHED:"),
+                Itob(new_id.load()),
+                Bytes(":"),
+                cid.get(),
+                Bytes(":"),
+                publisher.get()
+            ))
+        ])
     
     # Get model method
-    get_model = Seq([
-        # Validate input
-        Assert(Txn.application_args.length() == Int(2)),
-        Assert(Btoi(Txn.application_args[1]) > Int(0)),
-        Assert(Btoi(Txn.application_args[1]) <= App.globalGet(model_count_key)),
-        
-        # Return data via structured logs
-        Log(Concat(Bytes("MODEL_DATA:"), Txn.application_args[1])),
-        Log(Concat(Bytes("CID:"), App.globalGet(model_key(Btoi(Txn.application_args[1]), b"cid_")))),
-        Log(Concat(Bytes("PUBLISHER:"), App.globalGet(model_key(Btoi(Txn.application_args[1]), b"pub_")))),
-        Log(Concat(Bytes("LICENSE:"), App.globalGet(model_key(Btoi(Txn.application_args[1]), b"lic_")))),
-        Log(Concat(Bytes("TIMESTAMP:"), App.globalGet(model_key(Btoi(Txn.application_args[1]), b"ts_")))),
-        
-        Return(Int(1))
-    ])
+    @router.method(no_op=CallConfig.CALL)
+    def get_model(model_id: abi.Uint64) -> Expr:
+        return Seq([
+            # Validate input
+            Assert(model_id.get() > Int(0)),
+            Assert(model_id.get() <= App.globalGet(model_count_key)),
+            
+            # The raw ARC-4 argument is already the 8-byte box name, so it is
+            # used as-is rather than re-encoded
+            load_record(Txn.application_args[1]),
+            cid_length.store(ExtractUint16(record.load(), CID_LENGTH_OFFSET)),
+            
+            # Return data via a single structured log; fixed-width fields come
+            # first and the free-form license terms last
+            Log(Concat(
+                Bytes("MODEL_DATA:"), Txn.application_args[1],
+                Bytes("|PUBLISHER:"), Extract(record.load(), PUBLISHER_OFFSET, Int(32)),
+                Bytes("|TIMESTAMP:"), Extract(record.load(), TIMESTAMP_OFFSET, Int(8)),
+                Bytes("|CID:"), Extract(record.load(), CID_OFFSET, cid_length.load()),
+                Bytes("|LICENSE:"), Suffix(record.load(), CID_OFFSET + cid_length.load())
+            ))
+        ])
     
     # Get model count method
-    get_model_count = Seq([
-        Log(Concat(Bytes("MODEL_COUNT:"), Itob(App.globalGet(model_count_key)))),
-        Return(Int(1))
-    ])
-    
-    # Check if model exists
-    model_exists = Seq([
-        Assert(Txn.application_args.length() == Int(2)),
-        Assert(Btoi(Txn.application_args[1]) > Int(0)),
-        Log(Concat(
-            Bytes("MODEL_EXISTS:"),
-            If(
-                And(
-                    Btoi(Txn.application_args[1]) <= App.globalGet(model_count_key),
-                    Len(App.globalGet(model_key(Btoi(Txn.application_args[1]), b"cid_"))) > Int(0)
-                ),
-                Bytes("1"),  # Exists
-                Bytes("0")   # Does not exist
-            )
-        )),
-        Return(Int(1))
-    ])
-    
-    # Main program logic
-    program = Cond(
-        # Application creation
-        [Txn.application_id() == Int(0), on_creation],
-        
-        # Method calls
-        [And(
-            Txn.on_completion() == OnComplete.NoOp,
-            Txn.application_args.length() >= Int(1),
-            Txn.application_args[0] == Bytes("publish_model")
-        ), publish_model],
-        
-        [And(
-            Txn.on_completion() == OnComplete.NoOp,
-            Txn.application_args.length() >= Int(1),
-            Txn.application_args[0] == Bytes("get_model")
-        ), get_model],
-        
-        [And(
-            Txn.on_completion() == OnComplete.NoOp,
-            Txn.application_args.length() >= Int(1),
-            Txn.application_args[0] == Bytes("get_model_count")
-        ), get_model_count],
-        
-        [And(
-            Txn.on_completion() == OnComplete.NoOp,
-            Txn.application_args.length() >= Int(1),
-            Txn.application_args[0] == Bytes("model_exists")
-        ), model_exists],
-        
-        # Other transaction types
-        [Txn.on_completion() == OnComplete.OptIn, Return(Int(1))],
-        [Txn.on_completion() == OnComplete.CloseOut, Return(Int(1))],
-        [Txn.on_completion() == OnComplete.UpdateApplication, Return(Int(0))],
-        [Txn.on_completion() == OnComplete.DeleteApplication, Return(Int(0))],
-        
-        # Default: reject
-        [Int(1), Return(Int(0))]
-    )
+    @router.method(no_op=CallConfig.CALL)
+    def get_model_count() -> Expr:
+        return Seq([
+            Log(Concat(Bytes("MODEL_COUNT:"), Itob(App.globalGet(model_count_key))))
+        ])
+    
+    # Check if model exists; models are never deleted, so every id from 1 to
+    # the current count has a record and no box read is needed
+    @router.method(no_op=CallConfig.CALL)
+    def model_exists(model_id: abi.Uint64) -> Expr:
+        return Seq([
+            Assert(model_id.get() > Int(0)),
+            Log(Concat(
+                Bytes("MODEL_EXISTS:"),
+                If(
+                    model_id.get() <= App.globalGet(model_count_key),
+                    Bytes("1"),  # Exists
+                    Bytes("0")   # Does not exist
+                )
+            ))
+        ])
     
-    return program
+    # Method calls are dispatched by the router on their ARC-4 selector
+    approval, _, _ = router.build_program()
+    return approval
 
 def clear_state_program():
     """Clear state program"""
@@ -152,23 +150,24 @@ def clear_state_program():
 # ABI specification for client generation
 ABI_SPEC = {
     "name": "ModelRegistry",
-    "description": "Smart contract for registering ML models on Algorand",
+    "description": "Smart contract for registering ML models on Algorand. Each model is stored in a box named by its 8-byte big-endian id, which calls must include in their box references.",
     "methods": [
         {
             "name": "publish_model",
+            "desc": "Must immediately follow a payment to the app of at least 2500 + 400 * (50 + len(cid) + len(license_terms)) microAlgos, the minimum balance of the new model box",
             "args": [
                 {"type": "string", "name": "cid", "desc": "IPFS CID of the model"},
                 {"type": "address", "name": "publisher", "desc": "Publisher address"},
                 {"type": "string", "name": "license_terms", "desc": "License terms"}
             ],
-            "returns": {"type": "void", "desc": "Model published successfully"}
+            "returns": {"type": "void", "desc": "Model published successfully; the new model id is model_count + 1"}
         },
         {
             "name": "get_model",
             "args": [
                 {"type": "uint64", "name": "model_id", "desc": "Model ID to retrieve"}
             ],
-            "returns": {"type": "void", "desc": "Model data returned via logs"}
+            "returns": {"type": "void", "desc": "Model data returned via a single log: MODEL_DATA:<id>|PUBLISHER:<32>|TIMESTAMP:<8>|CID:<cid>|LICENSE:<terms>"}
         },
         {
             "name": "get_model_count",
@@ -187,15 +186,26 @@ ABI_SPEC = {
 
 if __name__ == "__main__":
     import json
+    from algosdk import abi as sdk_abi
+    from _teal_cache import compile_teal_cached
+    
+    # Compile the contracts (version 8 is the highest the pinned PyTeal supports);
+    # unchanged sources are served from .teal_cache/
+    optimize = OptimizeOptions(scratch_slots=True)
     
-    # Compile the contracts
     with open("model_registry_approval.teal", "w") as f:
-        f.write(compileTeal(approval_program(), Mode.Application, version=8))
+        f.write(compile_teal_cached(approval_program, version=8,
+                                    assembleConstants=True, optimize=optimize))
     
     with open("model_registry_clear.teal", "w") as f:
-        f.write(compileTeal(clear_state_program(), Mode.Application, version=8))
+        f.write(compile_teal_cached(clear_state_program, version=8,
+                                    assembleConstants=True, optimize=optimize))
+    
+    # Write ABI specification, recording each method's 4-byte ARC-4 selector
+    # (the value the approval program dispatches on) for client reference
+    for method in ABI_SPEC["methods"]:
+        method["selector"] = sdk_abi.Method.undictify(method).get_selector().hex()
     
-    # Write ABI specification
     with open("model_registry.json", "w") as f:
         json.dump(ABI_SPEC, f, indent=2)
     
@@ -1,181 +1,309 @@
 """
-Working DeSci Name Registry - Using proper PyTeal patterns
+DeSci Name Registry Smart Contract - Box Storage Version
+Enables human-readable names like smith.desci and quantlab.desci for Algorand addresses
 """
 
 from pyteal import *
 
 def approval_program():
-    # Method argument checks
-    method_register = Txn.application_args[0] == Bytes("register")
-    method_resolve = Txn.application_args[0] == Bytes("resolve")
-    method_update = Txn.application_args[0] == Bytes("update")
-    method_transfer = Txn.application_args[0] == Bytes("transfer")
-    method_delete = Txn.application_args[0] == Bytes("delete")
+    # Minimum balance of a name box at its largest: 2500 plus 400 per byte of
+    # the 32-byte key and an owner(32) + price(8) + timestamp(8) + 64-byte CID
+    # value. Registrants pay it up front, so a later update to a longer CID
+    # never draws on the app's own balance, and get it back on delete
+    NAME_BOX_MBR = Int(2500 + 400 * (32 + 32 + 8 + 8 + 64))
     
     # Scratch variables
     name_key = ScratchVar(TealType.bytes)
-    box_length = ScratchVar()
     
-    # Register method
-    handle_register = Seq(
-        Assert(Txn.application_args.length() == Int(4)),
-        name_key.store(Txn.application_args[1]),
-        Assert(Len(name_key.load()) > Int(0)),
-        Assert(Len(name_key.load()) <= Int(64)),
-        
-        # Check name doesn't exist
-        box_length.store(App.box_length(name_key.load())),
-        Assert(Not(box_length.load().hasValue())),
-        
-        # Create box with: owner(32) + price(8) + cid
-        App.box_put(
-            name_key.load(),
-            Concat(
-                Txn.sender(),  # 32 bytes owner
-                Itob(Btoi(Txn.application_args[3])),  # 8 bytes price
-                Txn.application_args[2]  # CID
-            )
-        ),
-        
-        Log(Concat(Bytes("REGISTERED:"), name_key.load())),
-        Return(Int(1))
+    # Names and CIDs arrive as ARC-4 strings; their 2-byte length prefix is
+    # checked against the payload so a malformed argument is rejected
+    def validate_string(value: abi.String, max_length: int) -> Expr:
+        return Seq(
+            Assert(value.length() == Len(value.get())),
+            Assert(value.length() > Int(0)),
+            Assert(value.length() <= Int(max_length))
+        )
+    
+    # Boxes are named by the SHA-256 of the name rather than the raw name, so
+    # user-chosen names with long shared prefixes spread evenly across the
+    # key space
+    def store_name_key(name: abi.String) -> Expr:
+        return name_key.store(Sha256(name.get()))
+    
+    # Existing records are read from the box once and sliced in scratch
+    box_value = ScratchVar(TealType.bytes)
+    
+    def load_box_value() -> Expr:
+        contents = App.box_get(name_key.load())
+        return Seq(
+            contents,
+            Assert(contents.hasValue()),
+            box_value.store(contents.value())
+        )
+    
+    # Creation needs no setup; opt-in and close-out are accepted, and only
+    # the creator may update or delete the application
+    is_creator = Assert(Txn.sender() == Global.creator_address())
+    router = Router(
+        "NameRegistry",
+        BareCallActions(
+            no_op=OnCompleteAction.create_only(Approve()),
+            opt_in=OnCompleteAction.always(Approve()),
+            close_out=OnCompleteAction.always(Approve()),
+            update_application=OnCompleteAction.call_only(is_creator),
+            delete_application=OnCompleteAction.call_only(is_creator)
+        )
     )
     
+    # Register method
+    @router.method(no_op=CallConfig.CALL)
+    def register(name: abi.String, cid: abi.String, price: abi.Uint64) -> Expr:
+        # Existence check (a MaybeValue must be evaluated before its
+        # hasValue() slot is read)
+        register_box = App.box_length(name_key.load())
+        return Seq(
+            validate_string(name, 64),
+            validate_string(cid, 64),
+            store_name_key(name),
+            
+            # The payment immediately before this call must cover the box MBR
+            Assert(Txn.group_index() > Int(0)),
+            Assert(Gtxn[Txn.group_index() - Int(1)].type_enum() == TxnType.Payment),
+            Assert(Gtxn[Txn.group_index() - Int(1)].receiver() == Global.current_application_address()),
+            Assert(Gtxn[Txn.group_index() - Int(1)].amount() >= NAME_BOX_MBR),
+            
+            # Check name doesn't exist
+            register_box,
+            Assert(Not(register_box.hasValue())),
+            
+            # Create box with: owner(32) + price(8) + timestamp(8) + cid
+            App.box_put(
+                name_key.load(),
+                Concat(
+                    Txn.sender(),  # 32 bytes owner
+                    price.encode(),  # 8 bytes price
+                    Itob(Global.latest_timestamp()),  # 8 bytes timestamp
+                    cid.get()  # CID
+                )
+            ),
+            
+            Log(Concat(Bytes("REGISTERED:"), name.get()))
+        )
+    
     # Resolve method
-    handle_resolve = Seq(
-        Assert(Txn.application_args.length() == Int(2)),
-        name_key.store(Txn.application_args[1]),
-        
-        # Check name exists
-        box_length.store(App.box_length(name_key.load())),
-        Assert(box_length.load().hasValue()),
-        
-        # Extract and log components
-        Log(Concat(Bytes("OWNER:"), App.box_extract(name_key.load(), Int(0), Int(32)))),
-        Log(Concat(Bytes("PRICE:"), App.box_extract(name_key.load(), Int(32), Int(8)))),
-        Log(Concat(Bytes("CID:"), App.box_extract(name_key.load(), Int(40), box_length.load().value() - Int(40)))),
-        
-        Return(Int(1))
-    )
+    @router.method(no_op=CallConfig.CALL)
+    def resolve(name: abi.String) -> Expr:
+        return Seq(
+            validate_string(name, 64),
+            store_name_key(name),
+            
+            # Check name exists
+            load_box_value(),
+            
+            # Extract and log components
+            Log(Concat(Bytes("OWNER:"), Extract(box_value.load(), Int(0), Int(32)))),
+            Log(Concat(Bytes("PRICE:"), Extract(box_value.load(), Int(32), Int(8)))),
+            Log(Concat(Bytes("TIMESTAMP:"), Extract(box_value.load(), Int(40), Int(8)))),
+            Log(Concat(Bytes("CID:"), Suffix(box_value.load(), Int(48))))
+        )
     
     # Update method
-    handle_update = Seq(
-        Assert(Txn.application_args.length() == Int(4)),
-        name_key.store(Txn.application_args[1]),
-        
-        # Check name exists
-        box_length.store(App.box_length(name_key.load())),
-        Assert(box_length.load().hasValue()),
-        
-        # Check ownership
-        Assert(App.box_extract(name_key.load(), Int(0), Int(32)) == Txn.sender()),
-        
-        # Update box with same owner but new price/CID
-        App.box_put(
-            name_key.load(),
-            Concat(
-                Txn.sender(),  # Keep same owner
-                Itob(Btoi(Txn.application_args[3])),  # New price
-                Txn.application_args[2]  # New CID
-            )
-        ),
-        
-        Log(Concat(Bytes("UPDATED:"), name_key.load())),
-        Return(Int(1))
-    )
+    @router.method(no_op=CallConfig.CALL)
+    def update(name: abi.String, cid: abi.String, price: abi.Uint64) -> Expr:
+        return Seq(
+            validate_string(name, 64),
+            validate_string(cid, 64),
+            store_name_key(name),
+            
+            # Check name exists
+            load_box_value(),
+            
+            # Check ownership
+            Assert(Extract(box_value.load(), Int(0), Int(32)) == Txn.sender()),
+            
+            # Rewrite price, timestamp and CID after the unchanged owner. A box
+            # cannot be resized in place, so a CID of a different length
+            # recreates the box instead
+            If(
+                Len(box_value.load()) - Int(48) == cid.length(),
+                App.box_replace(
+                    name_key.load(),
+                    Int(32),
+                    Concat(
+                        price.encode(),  # New price
+                        Itob(Global.latest_timestamp()),  # Update timestamp
+                        cid.get()  # New CID
+                    )
+                ),
+                Seq(
+                    Pop(App.box_delete(name_key.load())),
+                    App.box_put(
+                        name_key.load(),
+                        Concat(
+                            Txn.sender(),  # Keep same owner
+                            price.encode(),  # New price
+                            Itob(Global.latest_timestamp()),  # Update timestamp
+                            cid.get()  # New CID
+                        )
+                    )
+                )
+            ),
+            
+            Log(Concat(Bytes("UPDATED:"), name.get()))
+        )
     
-    # Delete method
-    handle_delete = Seq(
-        Assert(Txn.application_args.length() == Int(2)),
-        name_key.store(Txn.application_args[1]),
-        
-        # Check name exists
-        box_length.store(App.box_length(name_key.load())),
-        Assert(box_length.load().hasValue()),
-        
-        # Check ownership
-        Assert(App.box_extract(name_key.load(), Int(0), Int(32)) == Txn.sender()),
-        
-        # Delete box
-        App.box_delete(name_key.load()),
-        
-        Log(Concat(Bytes("DELETED:"), name_key.load())),
-        Return(Int(1))
-    )
+    # Transfer method
+    @router.method(no_op=CallConfig.CALL)
+    def transfer(name: abi.String, new_owner: abi.Address) -> Expr:
+        return Seq(
+            validate_string(name, 64),
+            store_name_key(name),
+            
+            # Check name exists
+            load_box_value(),
+            
+            # Check ownership
+            Assert(Extract(box_value.load(), Int(0), Int(32)) == Txn.sender()),
+            
+            # Overwrite only the owner and timestamp in place
+            App.box_replace(name_key.load(), Int(0), new_owner.get()),
+            App.box_replace(name_key.load(), Int(40), Itob(Global.latest_timestamp())),
+            
+            Log(Concat(Bytes("TRANSFERRED:"), name.get(), Bytes(":"), new_owner.get()))
+        )
     
-    # Main program
-    program = Cond(
-        # App creation
-        [Txn.application_id() == Int(0), Return(Int(1))],
-        
-        # NoOp methods
-        [And(Txn.on_completion() == OnComplete.NoOp, method_register), handle_register],
-        [And(Txn.on_completion() == OnComplete.NoOp, method_resolve), handle_resolve], 
-        [And(Txn.on_completion() == OnComplete.NoOp, method_update), handle_update],
-        [And(Txn.on_completion() == OnComplete.NoOp, method_delete), handle_delete],
-        
-        # Admin operations
-        [Txn.on_completion() == OnComplete.DeleteApplication, Return(Txn.sender() == Global.creator_address())],
-        [Txn.on_completion() == OnComplete.UpdateApplication, Return(Txn.sender() == Global.creator_address())],
-        
-        # Other operations
-        [Txn.on_completion() == OnComplete.OptIn, Return(Int(1))],
-        [Txn.on_completion() == OnComplete.CloseOut, Return(Int(1))],
-        
-        # Default reject
-        [Int(1), Return(Int(0))]
-    )
+    # Delete method ("delete" is a Python keyword, so the ABI name is given
+    # explicitly)
+    @router.method(no_op=CallConfig.CALL, name="delete")
+    def delete_name(name: abi.String) -> Expr:
+        return Seq(
+            validate_string(name, 64),
+            store_name_key(name),
+            
+            # Check name exists
+            load_box_value(),
+            
+            # Check ownership
+            Assert(Extract(box_value.load(), Int(0), Int(32)) == Txn.sender()),
+            
+            # Delete box
+            Pop(App.box_delete(name_key.load())),
+            
+            # Return the MBR deposit taken at registration to the owner
+            InnerTxnBuilder.Begin(),
+            InnerTxnBuilder.SetFields({
+                TxnField.type_enum: TxnType.Payment,
+                TxnField.receiver: Txn.sender(),
+                TxnField.amount: NAME_BOX_MBR,
+                TxnField.fee: Int(0)  # covered by the outer call via fee pooling
+            }),
+            InnerTxnBuilder.Submit(),
+            
+            Log(Concat(Bytes("DELETED:"), name.get()))
+        )
     
-    return program
+    # Exists method
+    @router.method(no_op=CallConfig.CALL)
+    def exists(name: abi.String) -> Expr:
+        exists_box = App.box_length(name_key.load())
+        return Seq(
+            validate_string(name, 64),
+            store_name_key(name),
+            exists_box,
+            
+            Log(Concat(
+                Bytes("EXISTS:"),
+                name.get(),
+                Bytes(":"),
+                If(exists_box.hasValue(), Bytes("1"), Bytes("0"))
+            ))
+        )
+    
+    # Method calls are dispatched by the router on their ARC-4 selector
+    approval, _, _ = router.build_program()
+    return approval
 
 def clear_state_program():
     return Return(Int(1))
 
-# ABI spec
+# ABI specification
 ABI_SPEC = {
-    "name": "NameRegistry", 
-    "description": "DeSci Name Registry for human-readable names on Algorand",
+    "name": "NameRegistry",
+    "description": "DeSci Name Registry for human-readable names on Algorand. Each name is stored in a box named by the SHA-256 of the name, which calls must include in their box references.",
     "methods": [
         {
             "name": "register",
+            "desc": "Must immediately follow a payment to the app of at least 60100 microAlgos, the minimum balance of the name's box",
             "args": [
-                {"type": "string", "name": "name", "desc": "Name to register"},
-                {"type": "string", "name": "cid", "desc": "IPFS CID"}, 
-                {"type": "string", "name": "price", "desc": "Price in microAlgos"}
+                {"type": "string", "name": "name", "desc": "The name to register (e.g., smith.desci)"},
+                {"type": "string", "name": "cid", "desc": "IPFS CID for the associated content (at most 64 bytes)"},
+                {"type": "uint64", "name": "price", "desc": "Price in microAlgos"}
             ],
-            "returns": {"type": "void"}
+            "returns": {"type": "void", "desc": "Name registered successfully"}
         },
         {
-            "name": "resolve", 
-            "args": [{"type": "string", "name": "name", "desc": "Name to resolve"}],
-            "returns": {"type": "void", "desc": "Data returned via logs"}
+            "name": "resolve",
+            "args": [
+                {"type": "string", "name": "name", "desc": "The name to resolve"}
+            ],
+            "returns": {"type": "void", "desc": "Name data returned via logs"}
         },
         {
             "name": "update",
             "args": [
-                {"type": "string", "name": "name", "desc": "Name to update"},
-                {"type": "string", "name": "cid", "desc": "New IPFS CID"},
-                {"type": "string", "name": "price", "desc": "New price"}
-            ], 
-            "returns": {"type": "void"}
+                {"type": "string", "name": "name", "desc": "The name to update"},
+                {"type": "string", "name": "cid", "desc": "New IPFS CID (at most 64 bytes)"},
+                {"type": "uint64", "name": "price", "desc": "New price in microAlgos"}
+            ],
+            "returns": {"type": "void", "desc": "Name updated successfully"}
+        },
+        {
+            "name": "transfer",
+            "args": [
+                {"type": "string", "name": "name", "desc": "The name to transfer"},
+                {"type": "address", "name": "new_owner", "desc": "New owner address"}
+            ],
+            "returns": {"type": "void", "desc": "Name transferred successfully"}
         },
         {
             "name": "delete",
-            "args": [{"type": "string", "name": "name", "desc": "Name to delete"}],
-            "returns": {"type": "void"}
+            "desc": "Deletes the name's box and returns its 60100 microAlgo deposit to the owner; the call must pay 2x the minimum fee to cover the inner payment (fee pooling)",
+            "args": [
+                {"type": "string", "name": "name", "desc": "The name to delete"}
+            ],
+            "returns": {"type": "void", "desc": "Name deleted successfully"}
+        },
+        {
+            "name": "exists",
+            "args": [
+                {"type": "string", "name": "name", "desc": "The name to check"}
+            ],
+            "returns": {"type": "void", "desc": "Existence status returned via logs"}
         }
     ]
 }
 
 if __name__ == "__main__":
     import json
+    from algosdk import abi as sdk_abi
+    from _teal_cache import compile_teal_cached
+    
+    # Unchanged sources are served from .teal_cache/
+    optimize = OptimizeOptions(scratch_slots=True)
     
     with open("name_registry_approval.teal", "w") as f:
-        f.write(compileTeal(approval_program(), Mode.Application, version=8))
+        f.write(compile_teal_cached(approval_program, version=8,
+                                    assembleConstants=True, optimize=optimize))
     
     with open("name_registry_clear.teal", "w") as f:
-        f.write(compileTeal(clear_state_program(), Mode.Application, version=8))
+        f.write(compile_teal_cached(clear_state_program, version=8,
+                                    assembleConstants=True, optimize=optimize))
         
+    # Record each method's 4-byte ARC-4 selector (the value the approval
+    # program dispatches on) for client reference
+    for method in ABI_SPEC["methods"]:
+        method["selector"] = sdk_abi.Method.undictify(method).get_selector().hex()
+    
     with open("name_registry.json", "w") as f:
         json.dump(ABI_SPEC, f, indent=2)
     
@@ -0,0 +1,104 @@
+"""
+Persistent algod connections for DeSciFi scripts
+Reuses one keep-alive HTTP(S) connection per thread instead of opening a new
+connection (and TLS handshake) for every algod call
+"""
+
+import http.client
+import json
+import threading
+from urllib import parse
+
+from algosdk import constants, error
+from algosdk.v2client import algod
+
+class KeepAliveAlgodClient(algod.AlgodClient):
+    """AlgodClient whose requests share a keep-alive connection per thread"""
+
+    def __init__(self, algod_token, algod_address, headers=None):
+        super().__init__(algod_token, algod_address, headers)
+        url = parse.urlsplit(algod_address)
+        self._connection_class = (
+            http.client.HTTPSConnection if url.scheme == "https" else http.client.HTTPConnection
+        )
+        self._netloc = url.netloc
+        self._base_path = url.path.rstrip("/")
+        self._local = threading.local()
+
+    def _connection(self):
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # No socket timeout: status_after_block long-polls for up to a
+            # round's worth of time and must not be cut short
+            connection = self._connection_class(self._netloc)
+            self._local.connection = connection
+        return connection
+
+    def _send(self, method, path, data, header):
+        # The body is read here too, so a failure part-way through a response
+        # also drops the connection and the thread's next request opens a
+        # fresh one. A failure on a reused connection (which the server may
+        # have closed) is retried once on a new one, but only where that
+        # cannot repeat a request algod may already have acted on: the
+        # request was not fully sent, or it is a GET. A POST such as a
+        # transaction submission that fails after sending is raised as is
+        for attempt in range(2):
+            reused = getattr(self._local, "connection", None) is not None
+            connection = self._connection()
+            sent = False
+            try:
+                connection.request(method, path, body=data, headers=header)
+                sent = True
+                resp = connection.getresponse()
+                return resp.status, resp.read()
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                self._local.connection = None
+                if attempt or not reused or (sent and method != "GET"):
+                    raise
+
+    def algod_request(
+        self,
+        method,
+        requrl,
+        params=None,
+        data=None,
+        headers=None,
+        response_format="json",
+    ):
+        """Execute a request over this thread's persistent connection; same
+        contract as AlgodClient.algod_request"""
+        header = {"User-Agent": "py-algorand-sdk"}
+
+        if self.headers:
+            header.update(self.headers)
+
+        if headers:
+            header.update(headers)
+
+        if requrl not in constants.no_auth:
+            header.update({constants.algod_auth_header: self.algod_token})
+
+        if requrl not in constants.unversioned_paths:
+            requrl = algod.api_version_path_prefix + requrl
+        if params:
+            requrl = requrl + "?" + parse.urlencode(params)
+
+        status, body = self._send(method, self._base_path + requrl, data, header)
+
+        if status >= 400:
+            message = body.decode("utf-8")
+            try:
+                message = json.loads(message)["message"]
+            except (ValueError, KeyError, TypeError):
+                pass
+            raise error.AlgodHTTPError(message, status)
+
+        if response_format == "json":
+            try:
+                return json.loads(body)
+            except Exception as e:
+                raise error.AlgodResponseError(
+                    "Failed to parse JSON response from algod"
+                ) from e
+        return body
@@ -0,0 +1,140 @@
+"""
+Name registration helpers shared by the DeSciFi demo-data scripts
+Builds NameRegistry register calls and submits them either as one atomic
+group or independently with overlapping confirmation waits
+"""
+
+import hashlib
+import json
+from algosdk import abi, error
+from algosdk.atomic_transaction_composer import AccountTransactionSigner, AtomicTransactionComposer, TransactionWithSigner
+from algosdk.future.transaction import ApplicationNoOpTxn, PaymentTxn, assign_group_id
+from algosdk.logic import get_application_address
+
+# orjson is optional; the stdlib encoder produces the same indented JSON
+try:
+    import orjson
+
+    def dump_json(obj):
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2)
+except ImportError:
+    def dump_json(obj):
+        return json.dumps(obj, indent=2).encode()
+
+# Selector of the NameRegistry register method, hashed once at import;
+# string arguments carry a 2-byte length prefix
+REGISTER_SELECTOR = abi.Method.from_signature("register(string,string,uint64)void").get_selector()
+ARC4_STRING = abi.StringType()
+
+# register must follow a payment covering the minimum balance of the name's
+# box, sized by the contract for the largest (64-byte) CID
+NAME_BOX_MBR = 2500 + 400 * (32 + 32 + 8 + 8 + 64)
+
+def name_box_refs(app_id, name):
+    """Box references for a name's record (boxes are named by sha256(name))"""
+    return [(app_id, hashlib.sha256(name.encode()).digest())]
+
+def build_register_txns(params, app_id, creator_address, name, cid, price_microalgos):
+    """Build the (unsigned) box MBR payment and register call for a name in
+    the Name Registry; the call must directly follow the payment"""
+    payment = PaymentTxn(
+        sender=creator_address,
+        sp=params,
+        receiver=get_application_address(app_id),
+        amt=NAME_BOX_MBR
+    )
+    call = ApplicationNoOpTxn(
+        sender=creator_address,
+        sp=params,
+        index=app_id,
+        app_args=[
+            REGISTER_SELECTOR,
+            ARC4_STRING.encode(name),
+            ARC4_STRING.encode(cid),
+            price_microalgos.to_bytes(8, "big")
+        ],
+        boxes=name_box_refs(app_id, name)
+    )
+    return [payment, call]
+
+def submit_all(client, signed_groups):
+    """Send each signed group without waiting for it; returns (tx_id, error)
+    pairs naming each group's last transaction"""
+    results = []
+    for signed_group in signed_groups:
+        try:
+            client.send_transactions(signed_group)
+            results.append((signed_group[-1].get_txid(), None))
+        except Exception as e:
+            results.append((None, e))
+    return results
+
+def poll_all(client, tx_ids, timeout_rounds=6):
+    """Wait for several pending transactions together, checking every
+    outstanding one once per round; returns an error (or None) per tx_id"""
+    outstanding = set(tx_ids)
+    errors = {}
+    last_round = client.status()["last-round"]
+    current_round = last_round + 1
+    
+    while outstanding:
+        for tx_id in list(outstanding):
+            try:
+                tx_info = client.pending_transaction_info(tx_id)
+            except error.AlgodHTTPError:
+                continue
+            
+            if tx_info.get("pool-error"):
+                errors[tx_id] = error.TransactionRejectedError("Transaction rejected: " + tx_info["pool-error"])
+                outstanding.discard(tx_id)
+            elif tx_info.get("confirmed-round", 0) > 0:
+                errors[tx_id] = None
+                outstanding.discard(tx_id)
+        
+        if not outstanding:
+            break
+        
+        if current_round > last_round + timeout_rounds:
+            for tx_id in outstanding:
+                errors[tx_id] = error.ConfirmationTimeoutError(f"Wait for transaction id {tx_id} timed out")
+            break
+        
+        client.status_after_block(current_round)
+        current_round += 1
+    
+    return [errors[tx_id] for tx_id in tx_ids]
+
+def register_atomically(client, registrations, private_key):
+    """Submit every registration's payment and call as one atomic group
+    confirmed in a single round; returns (call tx_id, error) pairs"""
+    signer = AccountTransactionSigner(private_key)
+    atc = AtomicTransactionComposer()
+    for txns in registrations:
+        for txn in txns:
+            atc.add_transaction(TransactionWithSigner(txn, signer))
+    
+    # The composer groups, signs, submits and waits for the group
+    try:
+        response = atc.execute(client, 4)
+    except Exception as e:
+        return [(None, e)] * len(registrations)
+    
+    # Each registration is a payment followed by its register call
+    return [(tx_id, None) for tx_id in response.tx_ids[1::2]]
+
+def register_concurrently(client, registrations, private_key):
+    """Submit each registration as its own group and confirm them together;
+    returns (call tx_id, error) pairs"""
+    signed_groups = []
+    for txns in registrations:
+        assign_group_id(txns)
+        signed_groups.append([txn.sign(private_key) for txn in txns])
+    results = submit_all(client, signed_groups)
+    
+    submitted = [tx_id for tx_id, submit_error in results if submit_error is None]
+    confirm_errors = dict(zip(submitted, poll_all(client, submitted)))
+    
+    for i, (tx_id, submit_error) in enumerate(results):
+        if submit_error is None and confirm_errors[tx_id] is not None:
+            results[i] = (None, confirm_errors[tx_id])
+    return results
@@ -0,0 +1,70 @@
+"""
+Compiled TEAL cache for DeSciFi contracts
+Skips the PyTeal compile when a contract's source has not changed, and the
+algod compile round-trip when the TEAL it produced has not changed
+"""
+
+import base64
+import functools
+import hashlib
+import inspect
+from importlib.metadata import version
+from pathlib import Path
+
+from pyteal import compileTeal, Mode, OptimizeOptions
+
+CACHE_DIR = Path(__file__).resolve().parent / ".teal_cache"
+PYTEAL_VERSION = version("pyteal")
+
+def _stable_value(value):
+    """Option value with a repr that is the same across runs: OptimizeOptions
+    contributes its full attribute state, and sets are sorted"""
+    if isinstance(value, OptimizeOptions):
+        return {name: _stable_value(field) for name, field in sorted(vars(value).items())}
+    if isinstance(value, (set, frozenset)):
+        return sorted(repr(item) for item in value)
+    return value
+
+def _options_fingerprint(options):
+    """Stable text form of compileTeal keyword options"""
+    parts = []
+    for name, value in sorted(options.items()):
+        parts.append(f"{name}={_stable_value(value)!r}")
+    return ",".join(parts)
+
+@functools.lru_cache(maxsize=None)
+def compile_cached(program_factory, version=8, mode=Mode.Application):
+    """Compile program_factory() to TEAL once per process; later calls with
+    the same factory, version and mode return the first result"""
+    return compileTeal(program_factory(), mode, version=version)
+
+def compile_teal_cached(program_factory, mode=Mode.Application, **options):
+    """Compile program_factory() to TEAL, reusing the result of a previous run
+    when the defining source file, PyTeal version and options are unchanged"""
+    source = Path(inspect.getsourcefile(program_factory)).read_bytes()
+    digest = hashlib.sha256(source)
+    digest.update(PYTEAL_VERSION.encode())
+    digest.update(f"{program_factory.__qualname__}:{mode}:{_options_fingerprint(options)}".encode())
+    cache_file = CACHE_DIR / f"{digest.hexdigest()}.teal"
+
+    if cache_file.exists():
+        return cache_file.read_text()
+
+    teal = compileTeal(program_factory(), mode, **options)
+    CACHE_DIR.mkdir(exist_ok=True)
+    cache_file.write_text(teal)
+    return teal
+
+def compile_program_cached(client, teal):
+    """Assemble TEAL to bytecode via client.compile, reusing the bytecode
+    from a previous run for identical TEAL source"""
+    digest = hashlib.sha256(teal.encode()).hexdigest()
+    cache_file = CACHE_DIR / f"{digest}.b64"
+
+    if cache_file.exists():
+        return base64.b64decode(cache_file.read_text())
+
+    result = client.compile(teal)['result']
+    CACHE_DIR.mkdir(exist_ok=True)
+    cache_file.write_text(result)
+    return base64.b64decode(result)
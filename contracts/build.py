@@ -0,0 +1,20 @@
+"""
+Build Script for DeSciFi
+Compiles every contract once and writes its TEAL and ABI artifacts
+"""
+
+import os
+import runpy
+from pathlib import Path
+
+# Each module's __main__ block writes its own .teal files and ABI spec
+CONTRACT_MODULES = ["ModelRegistry", "Escrow", "NameRegistryWorking"]
+
+def main():
+    """Build all contract artifacts next to their sources"""
+    os.chdir(Path(__file__).resolve().parent)
+    for module in CONTRACT_MODULES:
+        runpy.run_module(module, run_name="__main__")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,38 @@
+"""
+Shared pytest fixtures for DeSciFi Smart Contract tests
+"""
+
+import pytest
+
+from _teal_cache import compile_cached
+
+from ModelRegistry import approval_program as model_registry_approval, clear_state_program as model_registry_clear
+from Escrow import approval_program as escrow_approval, clear_state_program as escrow_clear
+from NameRegistryWorking import approval_program as name_registry_approval, clear_state_program as name_registry_clear
+
+# Each contract is compiled once per test session (once per worker under
+# pytest-xdist) and shared by every test that needs its TEAL; the fixtures
+# hold no other state, so tests can run in any order or worker
+@pytest.fixture(scope="session")
+def model_registry_teal():
+    """ModelRegistry approval and clear TEAL"""
+    return (
+        compile_cached(model_registry_approval, 8),
+        compile_cached(model_registry_clear, 8)
+    )
+
+@pytest.fixture(scope="session")
+def escrow_teal():
+    """Escrow approval and clear TEAL"""
+    return (
+        compile_cached(escrow_approval, 8),
+        compile_cached(escrow_clear, 8)
+    )
+
+@pytest.fixture(scope="session")
+def name_registry_teal():
+    """NameRegistry approval and clear TEAL"""
+    return (
+        compile_cached(name_registry_approval, 8),
+        compile_cached(name_registry_clear, 8)
+    )
@@ -5,22 +5,38 @@ Deploys ModelRegistry and Escrow contracts to Algorand TestNet
 
 import json
 import os
-import base64
+import time
+from concurrent.futures import ThreadPoolExecutor
 from algosdk import account, mnemonic
 from algosdk.v2client import algod
-from algosdk.future.transaction import ApplicationCreateTxn, wait_for_confirmation, StateSchema
+from algosdk.future.transaction import ApplicationCreateTxn, PaymentTxn, assign_group_id, wait_for_confirmation, StateSchema
 from algosdk.encoding import decode_address
-from pyteal import compileTeal, Mode
+from algosdk.logic import get_application_address
+from pyteal import MAX_PROGRAM_VERSION, OptimizeOptions
+
+from _teal_cache import compile_teal_cached, compile_program_cached
 
 # Import contract programs
 from ModelRegistry import approval_program as model_registry_approval, clear_state_program as model_registry_clear
 from Escrow import approval_program as escrow_approval, clear_state_program as escrow_clear
-from NameRegistry import approval_program as name_registry_approval, clear_state_program as name_registry_clear
+from NameRegistryWorking import approval_program as name_registry_approval, clear_state_program as name_registry_clear
 
 # Configuration
 ALGOD_TOKEN = os.getenv("ALGOD_TOKEN", "")
 ALGOD_ADDRESS = os.getenv("ALGOD_ADDRESS", "https://testnet-api.algonode.cloud")
 CREATOR_MNEMONIC = os.getenv("CREATOR_MNEMONIC", "")
+# Contracts are compiled for the newest TEAL version the installed PyTeal supports
+TEAL_VERSION = min(int(os.getenv("TEAL_VERSION", MAX_PROGRAM_VERSION)), MAX_PROGRAM_VERSION)
+
+# Global state each contract declares at creation; records live in boxes, so
+# only the id counters of ModelRegistry and Escrow need a slot
+MODEL_REGISTRY_SCHEMA = StateSchema(num_uints=1, num_byte_slices=0)  # model_count
+ESCROW_SCHEMA = StateSchema(num_uints=1, num_byte_slices=0)  # escrow_count
+NAME_REGISTRY_SCHEMA = StateSchema(num_uints=0, num_byte_slices=0)
+
+# An app account must hold the 0.1 ALGO base minimum balance before it can
+# take on box MBR (which callers pay per box) or send inner payments
+APP_ACCOUNT_FUNDING = 100_000
 
 def get_algod_client():
     """Initialize Algorand client"""
@@ -35,42 +51,77 @@ def get_creator_account():
     address = account.address_from_private_key(private_key)
     return address, private_key
 
-def compile_contract(approval_program, clear_program):
+def compile_contract(approval_program, clear_program, teal_version=MAX_PROGRAM_VERSION, optimize=None):
     """Compile PyTeal contracts to TEAL"""
-    approval_teal = compileTeal(approval_program(), Mode.Application, version=8)
-    clear_teal = compileTeal(clear_program(), Mode.Application, version=8)
+    if optimize is None:
+        optimize = OptimizeOptions(scratch_slots=True)
+    approval_teal = compile_teal_cached(approval_program, version=teal_version, assembleConstants=True, optimize=optimize)
+    clear_teal = compile_teal_cached(clear_program, version=teal_version, assembleConstants=True, optimize=optimize)
     return approval_teal, clear_teal
 
-def deploy_contract(client, creator_address, creator_private_key, approval_teal, clear_teal, app_args=None):
-    """Deploy a smart contract"""
-    
-    # Compile TEAL to bytecode
-    approval_result = client.compile(approval_teal)
-    clear_result = client.compile(clear_teal)
-    
-    # Get suggested parameters
-    params = client.suggested_params()
-    
-    # Create application transaction
-    txn = ApplicationCreateTxn(
+def compile_programs(client, teal_sources):
+    """Compile TEAL sources to bytecode, issuing any uncached algod compile calls concurrently"""
+    with ThreadPoolExecutor(max_workers=len(teal_sources)) as executor:
+        return list(executor.map(lambda teal: compile_program_cached(client, teal), teal_sources))
+
+def build_deploy_txn(creator_address, params, approval_program, clear_program, global_schema, app_args=None):
+    """Build the (unsigned) application create transaction for a contract"""
+    return ApplicationCreateTxn(
         sender=creator_address,
         sp=params,
         on_complete=0,  # NoOp
-        approval_program=base64.b64decode(approval_result['result']),
-        clear_program=base64.b64decode(clear_result['result']),
-        global_schema=StateSchema(num_uints=32, num_byte_slices=32),
+        approval_program=approval_program,
+        clear_program=clear_program,
+        global_schema=global_schema,
         local_schema=StateSchema(num_uints=0, num_byte_slices=0),
         app_args=app_args or []
     )
+
+def deploy_contracts(client, creator_address, creator_private_key, programs):
+    """Deploy several contracts in one atomic group and wait for a single confirmation.
     
-    # Sign and send transaction
-    signed_txn = txn.sign(creator_private_key)
-    tx_id = client.send_transaction(signed_txn)
+    programs is a list of (approval_teal, clear_teal, global_schema) triples;
+    returns a list of (app_id, tx_id) pairs in the same order.
+    """
     
-    # Wait for confirmation
-    result = wait_for_confirmation(client, tx_id, 4)
+    # Compile every TEAL program to bytecode in parallel
+    teal_sources = [teal for approval, clear, _ in programs for teal in (approval, clear)]
+    bytecode = compile_programs(client, teal_sources)
+    
+    # Build all create transactions against one set of suggested parameters
+    params = client.suggested_params()
+    txns = [
+        build_deploy_txn(creator_address, params, bytecode[2 * i], bytecode[2 * i + 1], global_schema)
+        for i, (_, _, global_schema) in enumerate(programs)
+    ]
+    assign_group_id(txns)
     
-    return result['application-index'], tx_id
+    # Sign and send the group in a single request
+    signed_txns = [txn.sign(creator_private_key) for txn in txns]
+    tx_ids = [signed_txn.get_txid() for signed_txn in signed_txns]
+    client.send_transactions(signed_txns)
+    
+    # The group confirms in one round; wait once, then read each app id
+    wait_for_confirmation(client, tx_ids[-1], 4)
+    return [
+        (client.pending_transaction_info(tx_id)['application-index'], tx_id)
+        for tx_id in tx_ids
+    ]
+
+def fund_app_accounts(client, creator_address, creator_private_key, app_ids, amount=APP_ACCOUNT_FUNDING):
+    """Pay each app account its base minimum balance in one atomic group; returns the tx ids"""
+    params = client.suggested_params()
+    txns = [
+        PaymentTxn(sender=creator_address, sp=params, receiver=get_application_address(app_id), amt=amount)
+        for app_id in app_ids
+    ]
+    assign_group_id(txns)
+    
+    signed_txns = [txn.sign(creator_private_key) for txn in txns]
+    tx_ids = [signed_txn.get_txid() for signed_txn in signed_txns]
+    client.send_transactions(signed_txns)
+    wait_for_confirmation(client, tx_ids[-1], 4)
+    return tx_ids
 
 def main():
     """Main deployment function"""
@@ -83,39 +134,34 @@ def main():
         
         # Compile contracts
         print("Compiling ModelRegistry contract...")
-        model_registry_approval_teal, model_registry_clear_teal = compile_contract(
-            model_registry_approval, model_registry_clear
-        )
+        model_registry_teal = compile_contract(model_registry_approval, model_registry_clear, teal_version=TEAL_VERSION)
         
         print("Compiling Escrow contract...")
-        escrow_approval_teal, escrow_clear_teal = compile_contract(
-            escrow_approval, escrow_clear
-        )
+        escrow_teal = compile_contract(escrow_approval, escrow_clear, teal_version=TEAL_VERSION)
         
         print("Compiling NameRegistry contract...")
-        name_registry_approval_teal, name_registry_clear_teal = compile_contract(
-            name_registry_approval, name_registry_clear
-        )
-        
-        # Deploy ModelRegistry
-        print("Deploying ModelRegistry contract...")
-        model_registry_app_id, model_registry_tx_id = deploy_contract(
-            client, creator_address, creator_private_key,
-            model_registry_approval_teal, model_registry_clear_teal
-        )
+        name_registry_teal = compile_contract(name_registry_approval, name_registry_clear, teal_version=TEAL_VERSION)
         
-        # Deploy Escrow
-        print("Deploying Escrow contract...")
-        escrow_app_id, escrow_tx_id = deploy_contract(
+        # Deploy all contracts together
+        print("Deploying ModelRegistry, Escrow and NameRegistry contracts...")
+        (
+            (model_registry_app_id, model_registry_tx_id),
+            (escrow_app_id, escrow_tx_id),
+            (name_registry_app_id, name_registry_tx_id)
+        ) = deploy_contracts(
             client, creator_address, creator_private_key,
-            escrow_approval_teal, escrow_clear_teal
+            [
+                (*model_registry_teal, MODEL_REGISTRY_SCHEMA),
+                (*escrow_teal, ESCROW_SCHEMA),
+                (*name_registry_teal, NAME_REGISTRY_SCHEMA)
+            ]
         )
         
-        # Deploy NameRegistry
-        print("Deploying NameRegistry contract...")
-        name_registry_app_id, name_registry_tx_id = deploy_contract(
+        # Fund the new app accounts so they can hold boxes
+        print("Funding application accounts...")
+        fund_app_accounts(
             client, creator_address, creator_private_key,
-            name_registry_approval_teal, name_registry_clear_teal
+            [model_registry_app_id, escrow_app_id, name_registry_app_id]
         )
         
         # Save deployment info
@@ -136,7 +182,7 @@ def main():
                     "tx_id": name_registry_tx_id
                 }
             },
-            "deployment_timestamp": client.status().get("time", "unknown")
+            "deployment_timestamp": int(time.time())  # Unix seconds, taken locally
         }
         
         with open("deployment_info.json", "w") as f:
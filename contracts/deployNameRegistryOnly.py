@@ -5,19 +5,27 @@ Simplified deployment script for testing the name registry
 
 import json
 import os
-import base64
+import time
 from algosdk import account, mnemonic
 from algosdk.v2client import algod
-from algosdk.future.transaction import ApplicationCreateTxn, wait_for_confirmation, StateSchema
-from pyteal import compileTeal, Mode
+from algosdk.future.transaction import ApplicationCreateTxn, PaymentTxn, wait_for_confirmation, StateSchema
+from algosdk.logic import get_application_address
+from pyteal import MAX_PROGRAM_VERSION, OptimizeOptions
+
+from _teal_cache import compile_teal_cached, compile_program_cached
 
 # Import name registry contract
-from NameRegistry import approval_program as name_registry_approval, clear_state_program as name_registry_clear
+from NameRegistryWorking import approval_program as name_registry_approval, clear_state_program as name_registry_clear
 
 # Configuration
 ALGOD_TOKEN = os.getenv("ALGOD_TOKEN", "")
 ALGOD_ADDRESS = os.getenv("ALGOD_ADDRESS", "https://testnet-api.algonode.cloud")
 CREATOR_MNEMONIC = os.getenv("CREATOR_MNEMONIC", "")
+# Contracts are compiled for the newest TEAL version the installed PyTeal supports
+TEAL_VERSION = min(int(os.getenv("TEAL_VERSION", MAX_PROGRAM_VERSION)), MAX_PROGRAM_VERSION)
+# The app account needs its 0.1 ALGO base minimum balance before it can hold
+# boxes; registrants pay each box's own MBR
+APP_ACCOUNT_FUNDING = 100_000
 
 def get_algod_client():
     return algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
@@ -30,15 +38,17 @@ def get_creator_account():
     address = account.address_from_private_key(private_key)
     return address, private_key
 
-def compile_contract(approval_program, clear_program):
-    approval_teal = compileTeal(approval_program(), Mode.Application, version=8)
-    clear_teal = compileTeal(clear_program(), Mode.Application, version=8)
+def compile_contract(approval_program, clear_program, teal_version=MAX_PROGRAM_VERSION, optimize=None):
+    if optimize is None:
+        optimize = OptimizeOptions(scratch_slots=True)
+    approval_teal = compile_teal_cached(approval_program, version=teal_version, assembleConstants=True, optimize=optimize)
+    clear_teal = compile_teal_cached(clear_program, version=teal_version, assembleConstants=True, optimize=optimize)
     return approval_teal, clear_teal
 
 def deploy_contract(client, creator_address, creator_private_key, approval_teal, clear_teal):
-    # Compile TEAL to bytecode
-    approval_result = client.compile(approval_teal)
-    clear_result = client.compile(clear_teal)
+    # Compile TEAL to bytecode (served from .teal_cache/ when unchanged)
+    approval_program = compile_program_cached(client, approval_teal)
+    clear_program = compile_program_cached(client, clear_teal)
     
     # Get suggested parameters
     params = client.suggested_params()
@@ -48,9 +58,9 @@ def deploy_contract(client, creator_address, creator_private_key, approval_teal,
         sender=creator_address,
         sp=params,
         on_complete=0,  # NoOp
-        approval_program=base64.b64decode(approval_result['result']),
-        clear_program=base64.b64decode(clear_result['result']),
-        global_schema=StateSchema(num_uints=8, num_byte_slices=8),  # Minimal schema
+        approval_program=approval_program,
+        clear_program=clear_program,
+        global_schema=StateSchema(num_uints=0, num_byte_slices=0),  # Records live in boxes
         local_schema=StateSchema(num_uints=0, num_byte_slices=0),
         app_args=[]
     )
@@ -64,6 +74,17 @@ def deploy_contract(client, creator_address, creator_private_key, approval_teal,
     
     return result['application-index'], tx_id
 
+def fund_app_account(client, creator_address, creator_private_key, app_id, amount=APP_ACCOUNT_FUNDING):
+    txn = PaymentTxn(
+        sender=creator_address,
+        sp=client.suggested_params(),
+        receiver=get_application_address(app_id),
+        amt=amount
+    )
+    tx_id = client.send_transaction(txn.sign(creator_private_key))
+    wait_for_confirmation(client, tx_id, 4)
+    return tx_id
+
 def main():
     try:
         # Initialize client and account
@@ -79,7 +100,7 @@ def main():
         
         # Compile contract
         print("Compiling NameRegistry contract...")
-        approval_teal, clear_teal = compile_contract(name_registry_approval, name_registry_clear)
+        approval_teal, clear_teal = compile_contract(name_registry_approval, name_registry_clear, teal_version=TEAL_VERSION)
         
         # Deploy NameRegistry
         print("Deploying NameRegistry contract...")
@@ -88,6 +109,10 @@ def main():
             approval_teal, clear_teal
         )
         
+        # Fund the app account so it can hold name boxes
+        print("Funding application account...")
+        fund_app_account(client, creator_address, creator_private_key, app_id)
+        
         # Save deployment info
         deployment_info = {
             "network": "testnet",
@@ -98,7 +123,7 @@ def main():
                     "tx_id": tx_id
                 }
             },
-            "deployment_timestamp": client.status().get("time", "unknown")
+            "deployment_timestamp": int(time.time())  # Unix seconds, taken locally
         }
         
         with open("name_registry_deployment.json", "w") as f:
@@ -5,18 +5,33 @@ Creates demo entries: smith.desci and quantlab.desci
 
 import json
 import os
-from algosdk import account, mnemonic, encoding
-from algosdk.v2client import algod
+import time
+from base64 import b64decode
+import msgpack
+from algosdk import abi, account, mnemonic, error
 from algosdk.future.transaction import ApplicationNoOpTxn, wait_for_confirmation
 
+from _algod_session import KeepAliveAlgodClient
+from _demo_registration import (
+    ARC4_STRING, build_register_txns, dump_json, name_box_refs,
+    register_atomically, register_concurrently
+)
+
 # Configuration
 ALGOD_TOKEN = os.getenv("ALGOD_TOKEN", "")
 ALGOD_ADDRESS = os.getenv("ALGOD_ADDRESS", "https://testnet-api.algonode.cloud")
 CREATOR_MNEMONIC = os.getenv("CREATOR_MNEMONIC", "")
+# Set ATOMIC_REGISTRATION=0 to submit demo names independently, so one
+# failing name does not roll back the others
+ATOMIC_REGISTRATION = os.getenv("ATOMIC_REGISTRATION", "1") != "0"
+
+# Selector of the NameRegistry resolve method, hashed once at import
+RESOLVE_SELECTOR = abi.Method.from_signature("resolve(string)void").get_selector()
 
 def get_algod_client():
     """Initialize Algorand client"""
-    return algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
+    # Every call in a run reuses one keep-alive connection to algod
+    return KeepAliveAlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
 
 def get_creator_account():
     """Get creator account from mnemonic"""
@@ -27,6 +42,26 @@ def get_creator_account():
     address = account.address_from_private_key(private_key)
     return address, private_key
 
+class ParamsCache:
+    """Suggested transaction parameters, refetched only once they are older than ttl seconds.
+    
+    Parameters stay valid for 1000 rounds from their first valid round, so
+    reusing them for a minute costs nothing but an algod round-trip saved.
+    """
+    
+    def __init__(self, client, ttl=60):
+        self.client = client
+        self.ttl = ttl
+        self._params = None
+        self._fetched_at = 0.0
+    
+    def get(self):
+        now = time.monotonic()
+        if self._params is None or now - self._fetched_at > self.ttl:
+            self._params = self.client.suggested_params()
+            self._fetched_at = now
+        return self._params
+
 def load_deployment_info():
     """Load deployment info to get contract app IDs"""
     try:
@@ -35,33 +70,22 @@ def load_deployment_info():
     except FileNotFoundError:
         raise FileNotFoundError("deployment_info.json not found. Please deploy contracts first.")
 
-def register_name(client, app_id, creator_address, creator_private_key, name, cid, price_microalgos):
-    """Register a name in the Name Registry"""
-    
-    # Get suggested parameters
-    params = client.suggested_params()
-    
-    # Create application call transaction
-    txn = ApplicationNoOpTxn(
-        sender=creator_address,
-        sp=params,
-        index=app_id,
-        app_args=[
-            "register".encode(),
-            name.encode(),
-            cid.encode(),
-            str(price_microalgos).encode()
-        ]
+def simulate_logs(client, signed_txn):
+    """Evaluate a signed transaction against current ledger state without
+    submitting it, returning its logs (no fee is paid and no round waited for)"""
+    request = msgpack.packb({"txn-groups": [{"txns": [signed_txn.dictify()]}]}, use_bin_type=True)
+    result = client.algod_request(
+        "POST",
+        "/transactions/simulate",
+        params={"format": "json"},
+        data=request,
+        headers={"Content-Type": "application/msgpack"}
     )
     
-    # Sign and send transaction
-    signed_txn = txn.sign(creator_private_key)
-    tx_id = client.send_transaction(signed_txn)
-    
-    # Wait for confirmation
-    result = wait_for_confirmation(client, tx_id, 4)
-    
-    return result, tx_id
+    group = result["txn-groups"][0]
+    if group.get("failure-message"):
+        raise RuntimeError(f"Simulation failed: {group['failure-message']}")
+    return [b64decode(log) for log in group["txn-results"][0]["txn-result"].get("logs", [])]
 
 def main():
     """Main function to initialize demo data"""
@@ -78,6 +102,9 @@ def main():
         
         print(f"Using NameRegistry App ID: {name_registry_app_id}")
         
+        # Registrations and the resolve test share suggested parameters
+        params_cache = ParamsCache(client)
+        
         # Demo data to register
         demo_names = [
             {
@@ -104,33 +131,39 @@ def main():
         
         registered_names = []
         
-        for demo in demo_names:
-            try:
-                print(f"Registering {demo['name']}...")
-                
-                result, tx_id = register_name(
-                    client, 
-                    name_registry_app_id, 
-                    creator_address, 
-                    creator_private_key,
-                    demo['name'],
-                    demo['cid'],
-                    demo['price']
-                )
-                
-                registered_names.append({
-                    "name": demo['name'],
-                    "tx_id": tx_id,
-                    "price_algo": demo['price'] / 1_000_000,
-                    "description": demo['description'],
-                    "cid": demo['cid']
-                })
-                
-                print(f"✅ Registered {demo['name']} - TX ID: {tx_id}")
-                
-            except Exception as e:
-                print(f"❌ Failed to register {demo['name']}: {str(e)}")
+        # Build every registration against one set of suggested parameters
+        params = params_cache.get()
+        registrations = [
+            build_register_txns(
+                params,
+                name_registry_app_id,
+                creator_address,
+                demo['name'],
+                demo['cid'],
+                demo['price']
+            )
+            for demo in demo_names
+        ]
+        
+        if ATOMIC_REGISTRATION:
+            results = register_atomically(client, registrations, creator_private_key)
+        else:
+            results = register_concurrently(client, registrations, creator_private_key)
+        
+        for demo, (tx_id, register_error) in zip(demo_names, results):
+            if register_error is not None:
+                print(f"❌ Failed to register {demo['name']}: {str(register_error)}")
                 continue
+            
+            registered_names.append({
+                "name": demo['name'],
+                "tx_id": tx_id,
+                "price_algo": demo['price'] / 1_000_000,
+                "description": demo['description'],
+                "cid": demo['cid']
+            })
+            
+            print(f"✅ Registered {demo['name']} - TX ID: {tx_id}")
         
         # Save demo data info
         demo_data_info = {
@@ -138,11 +171,11 @@ def main():
             "name_registry_app_id": name_registry_app_id,
             "creator_address": creator_address,
             "registered_names": registered_names,
-            "initialization_timestamp": client.status().get("time", "unknown")
+            "initialization_timestamp": int(time.time())  # Unix seconds, taken locally
         }
         
-        with open("demo_data.json", "w") as f:
-            json.dump(demo_data_info, f, indent=2)
+        with open("demo_data.json", "wb") as f:
+            f.write(dump_json(demo_data_info))
         
         print("\n=== Demo Data Initialization Complete ===")
         print(f"Successfully registered {len(registered_names)} names:")
@@ -157,28 +190,37 @@ def main():
             
             try:
                 # Create resolve transaction
-                params = client.suggested_params()
+                params = params_cache.get()
                 resolve_txn = ApplicationNoOpTxn(
                     sender=creator_address,
                     sp=params,
                     index=name_registry_app_id,
                     app_args=[
-                        "resolve".encode(),
-                        test_name.encode()
-                    ]
+                        RESOLVE_SELECTOR,
+                        ARC4_STRING.encode(test_name)
+                    ],
+                    boxes=name_box_refs(name_registry_app_id, test_name)
                 )
                 
                 signed_resolve_txn = resolve_txn.sign(creator_private_key)
-                resolve_tx_id = client.send_transaction(signed_resolve_txn)
-                resolve_result = wait_for_confirmation(client, resolve_tx_id, 4)
                 
-                print(f"✅ Resolve test successful - TX ID: {resolve_tx_id}")
+                # resolve only reads state, so simulate it where the node
+                # supports simulation (dryrun cannot read boxes) and submit it
+                # for real otherwise
+                try:
+                    resolve_logs = simulate_logs(client, signed_resolve_txn)
+                    print("✅ Resolve test successful (simulated)")
+                except error.AlgodHTTPError:
+                    resolve_tx_id = client.send_transaction(signed_resolve_txn)
+                    resolve_result = wait_for_confirmation(client, resolve_tx_id, 4)
+                    resolve_logs = [b64decode(log) for log in resolve_result.get('logs', [])]
+                    print(f"✅ Resolve test successful - TX ID: {resolve_tx_id}")
                 
                 # Print logs if available
-                if 'logs' in resolve_result:
+                if resolve_logs:
                     print("Resolution logs:")
-                    for log in resolve_result['logs']:
-                        print(f"  {encoding.base64.b64decode(log).decode()}")
+                    for log in resolve_logs:
+                        print(f"  {log.decode()}")
                         
             except Exception as e:
                 print(f"❌ Resolve test failed: {str(e)}")
@@ -5,17 +5,23 @@ Creates demo entries: smith.desci and quantlab.desci
 
 import json
 import os
-from algosdk import account, mnemonic, encoding
-from algosdk.v2client import algod
-from algosdk.future.transaction import ApplicationNoOpTxn, wait_for_confirmation
+import time
+from algosdk import account, mnemonic
+
+from _algod_session import KeepAliveAlgodClient
+from _demo_registration import build_register_txns, dump_json, register_atomically, register_concurrently
 
 # Configuration
 ALGOD_TOKEN = os.getenv("ALGOD_TOKEN", "")
 ALGOD_ADDRESS = os.getenv("ALGOD_ADDRESS", "https://testnet-api.algonode.cloud")
 CREATOR_MNEMONIC = os.getenv("CREATOR_MNEMONIC", "")
+# Set ATOMIC_REGISTRATION=0 to submit demo names independently, so one
+# failing name does not roll back the others
+ATOMIC_REGISTRATION = os.getenv("ATOMIC_REGISTRATION", "1") != "0"
 
 def get_algod_client():
-    return algod.AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
+    # Every call in a run reuses one keep-alive connection to algod
+    return KeepAliveAlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS)
 
 def get_creator_account():
     if not CREATOR_MNEMONIC:
@@ -32,32 +38,6 @@ def load_deployment_info():
     except FileNotFoundError:
         raise FileNotFoundError("name_registry_deployment.json not found. Please deploy contract first.")
 
-def register_name(client, app_id, creator_address, creator_private_key, name, cid, price_microalgos):
-    # Get suggested parameters
-    params = client.suggested_params()
-    
-    # Create application call transaction
-    txn = ApplicationNoOpTxn(
-        sender=creator_address,
-        sp=params,
-        index=app_id,
-        app_args=[
-            "register".encode(),
-            name.encode(),
-            cid.encode(),
-            str(price_microalgos).encode()
-        ]
-    )
-    
-    # Sign and send transaction
-    signed_txn = txn.sign(creator_private_key)
-    tx_id = client.send_transaction(signed_txn)
-    
-    # Wait for confirmation
-    result = wait_for_confirmation(client, tx_id, 4)
-    
-    return result, tx_id
-
 def main():
     try:
         # Initialize client and account
@@ -92,33 +72,39 @@ def main():
         
         registered_names = []
         
-        for demo in demo_names:
-            try:
-                print(f"Registering {demo['name']}...")
-                
-                result, tx_id = register_name(
-                    client, 
-                    name_registry_app_id, 
-                    creator_address, 
-                    creator_private_key,
-                    demo['name'],
-                    demo['cid'],
-                    demo['price']
-                )
-                
-                registered_names.append({
-                    "name": demo['name'],
-                    "tx_id": tx_id,
-                    "price_algo": demo['price'] / 1_000_000,
-                    "description": demo['description'],
-                    "cid": demo['cid']
-                })
-                
-                print(f"✅ Registered {demo['name']} - TX ID: {tx_id}")
-                
-            except Exception as e:
-                print(f"❌ Failed to register {demo['name']}: {str(e)}")
+        # Build every registration against one set of suggested parameters
+        params = client.suggested_params()
+        registrations = [
+            build_register_txns(
+                params,
+                name_registry_app_id,
+                creator_address,
+                demo['name'],
+                demo['cid'],
+                demo['price']
+            )
+            for demo in demo_names
+        ]
+        
+        if ATOMIC_REGISTRATION:
+            results = register_atomically(client, registrations, creator_private_key)
+        else:
+            results = register_concurrently(client, registrations, creator_private_key)
+        
+        for demo, (tx_id, register_error) in zip(demo_names, results):
+            if register_error is not None:
+                print(f"❌ Failed to register {demo['name']}: {str(register_error)}")
                 continue
+            
+            registered_names.append({
+                "name": demo['name'],
+                "tx_id": tx_id,
+                "price_algo": demo['price'] / 1_000_000,
+                "description": demo['description'],
+                "cid": demo['cid']
+            })
+            
+            print(f"✅ Registered {demo['name']} - TX ID: {tx_id}")
         
         # Save demo data info
         demo_data_info = {
@@ -126,11 +112,11 @@ def main():
             "name_registry_app_id": name_registry_app_id,
             "creator_address": creator_address,
             "registered_names": registered_names,
-            "initialization_timestamp": client.status().get("time", "unknown")
+            "initialization_timestamp": int(time.time())  # Unix seconds, taken locally
         }
         
-        with open("demo_data.json", "w") as f:
-            json.dump(demo_data_info, f, indent=2)
+        with open("demo_data.json", "wb") as f:
+            f.write(dump_json(demo_data_info))
         
         print("\n=== Demo Data Initialization Complete ===")
         print(f"Successfully registered {len(registered_names)} names:")
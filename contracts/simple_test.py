@@ -1,5 +1,7 @@
 from pyteal import *
 
+from _teal_cache import compile_cached
+
 def simple_approval():
     return Cond(
         [Txn.application_id() == Int(0), Return(Int(1))],
@@ -8,6 +10,6 @@ def simple_approval():
     )
 
 if __name__ == "__main__":
-    teal = compileTeal(simple_approval(), Mode.Application, version=8)
+    teal = compile_cached(simple_approval, 8)
     print("Simple contract compiled successfully!")
     print(f"Length: {len(teal)}")
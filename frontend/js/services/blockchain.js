@@ -6,6 +6,7 @@
 class BlockchainService {
     constructor() {
         this.algodClient = null;
+        this.indexerClient = null;
         this.walletConnectors = {};
         this.isInitialized = false;
         this.connectedAccount = null;
@@ -20,6 +21,7 @@ class BlockchainService {
             
             // Initialize Algorand client
             this.algodClient = new algosdk.Algodv2('', 'https://testnet-api.algonode.cloud', '');
+            this.indexerClient = new algosdk.Indexer('', 'https://testnet-idx.algonode.cloud', '');
             
             // Initialize wallet connectors
             await this.initializeWalletConnectors();
@@ -30,7 +32,7 @@ class BlockchainService {
             // Initialize smart contract service
             if (window.SmartContractService) {
                 this.smartContractService = new window.SmartContractService();
-                await this.smartContractService.initialize(this.algodClient);
+                await this.smartContractService.initialize(this.algodClient, this.indexerClient);
             }
             
             this.isInitialized = true;
@@ -1269,13 +1271,11 @@ class BlockchainService {
 
             console.log('📋 Publishing model to smart contract...');
 
-            const txn = await this.smartContractService.publishModel(
+            const result = await this.submitNewRecordGroup(() => this.smartContractService.publishModel(
                 this.connectedAccount.address,
                 modelCID,
                 licenseTerms
-            );
-
-            const result = await this.signAndSubmitTransaction(txn);
+            ));
             console.log('✅ Model published to smart contract:', result.txId);
             
             return result;
@@ -1299,15 +1299,13 @@ class BlockchainService {
             console.log('🔒 Creating escrow purchase...');
 
             const priceInMicroAlgos = Math.round(priceInAlgo * 1000000);
-            const txns = await this.smartContractService.createEscrow(
+            const results = await this.submitNewRecordGroup(() => this.smartContractService.createEscrow(
                 this.connectedAccount.address,
                 sellerAddress,
                 modelId,
                 priceInMicroAlgos
-            );
-
-            const results = await this.signAndSubmitTransactionGroup(txns);
-            console.log('✅ Escrow purchase completed:', results);
+            ));
+            console.log('✅ Escrow purchase completed:', results.txId);
             
             return results;
 
@@ -1317,6 +1315,28 @@ class BlockchainService {
         }
     }
 
+    /**
+     * Build, sign and submit a group creating a model or escrow. Its box
+     * references are predicted from the contract counter; if other records
+     * took those ids before submission, the group is rebuilt against the
+     * re-read counter and signed again
+     */
+    async submitNewRecordGroup(buildTxns) {
+        const maxAttempts = 3;
+
+        for (let attempt = 1; ; attempt++) {
+            const txns = await buildTxns();
+            try {
+                return await this.signAndSubmitTransactionGroup(txns);
+            } catch (error) {
+                if (attempt >= maxAttempts || !this.smartContractService.isStaleRecordBoxError(error)) {
+                    throw error;
+                }
+                console.log('🔁 Record id changed before submission, rebuilding transactions...');
+            }
+        }
+    }
+
     async releaseEscrowFunds(escrowId) {
         try {
             if (!this.smartContractService) {
@@ -1366,6 +1386,7 @@ class BlockchainService {
                 );
                 
                 return {
+                    txId: fakeTxIds[fakeTxIds.length - 1],
                     txIds: fakeTxIds,
                     confirmed: true
                 };
@@ -1387,9 +1408,14 @@ class BlockchainService {
                     throw new Error(`Unsupported wallet type: ${this.connectedAccount.walletType}`);
             }
 
+            // sendRawTransaction reports the group's first transaction (the
+            // payment); the app call is last, so its own id is waited on
+            const txIds = txns.map(txn => txn.txID());
+            const txId = txIds[txIds.length - 1];
+
             // Submit transaction group
             console.log('📤 Submitting transaction group to network...');
-            const { txId } = await this.algodClient.sendRawTransaction(signedTxns).do();
+            await this.algodClient.sendRawTransaction(signedTxns).do();
             
             // Wait for confirmation
             console.log('⏳ Waiting for confirmation...');
@@ -1398,7 +1424,8 @@ class BlockchainService {
             console.log('✅ Transaction group confirmed in round:', confirmedTxn['confirmed-round']);
             
             return {
-                txIds: [txId], // Group leader transaction ID
+                txId: txId, // App call transaction ID
+                txIds: txIds,
                 confirmed: true,
                 round: confirmedTxn['confirmed-round']
             };
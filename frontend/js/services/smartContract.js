@@ -3,6 +3,23 @@
  * Handles interaction with deployed ModelRegistry and Escrow contracts
  */
 
+// ARC-4 methods the contracts dispatch on: each call's first argument is the
+// method's 4-byte selector, strings carry a 2-byte length prefix, addresses
+// are their 32-byte public keys and uint64s are 8 bytes big-endian
+const CONTRACT_METHODS = {
+    publishModel: 'publish_model(string,address,string)void',
+    createEscrow: 'create_escrow(uint64,address,uint64)void',
+    releasePayment: 'release_payment(uint64)void'
+};
+
+// A new record's id is only known once the call runs (counter + 1), so the
+// calls creating one reference this many candidate boxes from the predicted id
+const NEW_RECORD_BOX_WINDOW = 4;
+
+// Minimum balance each new box adds to its app account (2500 plus 400 per
+// byte of box name and value), paid by the caller creating the box
+const ESCROW_BOX_MBR = 2500 + 400 * (8 + 104);
+
 class SmartContractService {
     constructor() {
         // Contract IDs from deployment_info.json
@@ -11,12 +28,14 @@ class SmartContractService {
         this.NAME_REGISTRY_APP_ID = 745493991;
         
         this.algodClient = null;
+        this.indexerClient = null;
         this.isInitialized = false;
     }
 
-    async initialize(algodClient) {
+    async initialize(algodClient, indexerClient) {
         try {
             this.algodClient = algodClient;
+            this.indexerClient = indexerClient;
             this.isInitialized = true;
             console.log('✅ Smart Contract Service initialized');
             console.log(`📋 Model Registry: ${this.MODEL_REGISTRY_APP_ID}`);
@@ -28,8 +47,44 @@ class SmartContractService {
         }
     }
 
+    selector(method) {
+        return algosdk.ABIMethod.fromSignature(CONTRACT_METHODS[method]).getSelector();
+    }
+
+    // Models and escrows are stored in boxes named by their 8-byte big-endian id
+    recordBoxRefs(id) {
+        return [{ appIndex: 0, name: algosdk.encodeUint64(id) }];
+    }
+
+    newRecordBoxRefs(predictedId) {
+        return Array.from({ length: NEW_RECORD_BOX_WINDOW }, (_, i) => this.recordBoxRefs(predictedId + i)[0]);
+    }
+
+    // Id the next model or escrow will get: one past the app's global counter.
+    // This is only a prediction: a publish or purchase confirmed between
+    // building and submitting a transaction takes the id. The window from
+    // newRecordBoxRefs absorbs a few such races; past that the call fails with
+    // an invalid box reference (isStaleRecordBoxError) and is built again
+    async nextRecordId(appId, counterKey) {
+        const appInfo = await this.algodClient.getApplicationByID(appId).do();
+        const counter = (appInfo.params['global-state'] || []).find(
+            item => Buffer.from(item.key, 'base64').toString() === counterKey
+        );
+        return (counter ? counter.value.uint : 0) + 1;
+    }
+
+    isStaleRecordBoxError(error) {
+        return /invalid box reference/i.test(error.message || '');
+    }
+
+    async readRecordBox(appId, id) {
+        const box = await this.algodClient.getApplicationBoxByName(appId, algosdk.encodeUint64(id)).do();
+        return box.value;
+    }
+
     /**
      * Publish a model to the Model Registry smart contract
+     * Returns the storage deposit payment and publish call as one group
      */
     async publishModel(publisherAddress, modelCID, licenseTerms) {
         try {
@@ -40,26 +95,43 @@ class SmartContractService {
             console.log('📋 Publishing model to smart contract...');
 
             const params = await this.algodClient.getTransactionParams().do();
+            const modelId = await this.nextRecordId(this.MODEL_REGISTRY_APP_ID, 'model_count');
+            const arc4String = new algosdk.ABIStringType();
             
+            // The new model box's minimum balance is paid by the publisher
+            const encoder = new TextEncoder();
+            const boxMbr = 2500 + 400 * (8 + 42 + encoder.encode(modelCID).length + encoder.encode(licenseTerms).length);
+            const paymentTxn = algosdk.makePaymentTxnWithSuggestedParamsFromObject({
+                from: publisherAddress,
+                to: algosdk.getApplicationAddress(this.MODEL_REGISTRY_APP_ID),
+                amount: boxMbr,
+                suggestedParams: params
+            });
+
             // Prepare application call arguments
             const appArgs = [
-                new TextEncoder().encode("publish_model"),
-                new TextEncoder().encode(modelCID),
+                this.selector('publishModel'),
+                arc4String.encode(modelCID),
                 algosdk.decodeAddress(publisherAddress).publicKey,
-                new TextEncoder().encode(licenseTerms)
+                arc4String.encode(licenseTerms)
             ];
 
             // Create application call transaction
-            const txn = algosdk.makeApplicationCallTxnFromObject({
+            const appCallTxn = algosdk.makeApplicationCallTxnFromObject({
                 from: publisherAddress,
                 appIndex: this.MODEL_REGISTRY_APP_ID,
                 onComplete: algosdk.OnApplicationComplete.NoOpOC,
                 appArgs: appArgs,
+                boxes: this.newRecordBoxRefs(modelId),
                 suggestedParams: params,
             });
 
-            console.log('✅ Model registry transaction created');
-            return txn;
+            // The publish call must directly follow its payment
+            const txns = [paymentTxn, appCallTxn];
+            algosdk.assignGroupID(txns);
+
+            console.log('✅ Model registry transaction group created');
+            return txns;
 
         } catch (error) {
             console.error('❌ Error creating model registry transaction:', error);
@@ -88,19 +160,21 @@ class SmartContractService {
             }
 
             const params = await this.algodClient.getTransactionParams().do();
+            const escrowId = await this.nextRecordId(this.ESCROW_APP_ID, 'escrow_count');
 
-            // Create payment transaction to escrow contract
+            // Create payment transaction to escrow contract; the price is held
+            // in escrow and the rest covers the new escrow box's minimum balance
             const paymentTxn = algosdk.makePaymentTxnWithSuggestedParamsFromObject({
                 from: buyerAddress,
                 to: algosdk.getApplicationAddress(this.ESCROW_APP_ID),
-                amount: priceInMicroAlgos,
+                amount: priceInMicroAlgos + ESCROW_BOX_MBR,
                 suggestedParams: params,
                 note: new TextEncoder().encode(`Escrow payment for model ${modelId}`)
             });
 
             // Create application call transaction
             const appArgs = [
-                new TextEncoder().encode("create_escrow"),
+                this.selector('createEscrow'),
                 algosdk.encodeUint64(modelId),
                 algosdk.decodeAddress(sellerAddress).publicKey,
                 algosdk.encodeUint64(priceInMicroAlgos)
@@ -111,6 +185,7 @@ class SmartContractService {
                 appIndex: this.ESCROW_APP_ID,
                 onComplete: algosdk.OnApplicationComplete.NoOpOC,
                 appArgs: appArgs,
+                boxes: this.newRecordBoxRefs(escrowId),
                 suggestedParams: params,
                 note: new TextEncoder().encode(`Escrow creation for model ${modelId}`)
             });
@@ -120,7 +195,7 @@ class SmartContractService {
             algosdk.assignGroupID(txns);
 
             console.log('✅ Escrow transaction group created');
-            console.log(`📊 Payment: ${priceInMicroAlgos} microAlgos to escrow contract`);
+            console.log(`📊 Payment: ${priceInMicroAlgos} microAlgos + ${ESCROW_BOX_MBR} storage deposit to escrow contract`);
             console.log(`🔢 Model ID: ${modelId}, Seller: ${sellerAddress}`);
 
             return txns;
@@ -132,9 +207,9 @@ class SmartContractService {
     }
 
     /**
-     * Release escrow funds to seller (called by buyer after receiving model)
+     * Release escrow funds to seller (called by the seller once the model is delivered)
      */
-    async releaseEscrow(buyerAddress, escrowId) {
+    async releaseEscrow(sellerAddress, escrowId) {
         try {
             if (!this.isInitialized) {
                 throw new Error('Smart Contract Service not initialized');
@@ -142,18 +217,23 @@ class SmartContractService {
 
             console.log('💰 Releasing escrow funds...');
 
+            // The fee also covers the contract's two inner payments, to the
+            // seller and the buyer's box deposit refund (fee pooling)
             const params = await this.algodClient.getTransactionParams().do();
+            params.flatFee = true;
+            params.fee = 3 * (params.minFee || 1000);
             
             const appArgs = [
-                new TextEncoder().encode("release_escrow"),
+                this.selector('releasePayment'),
                 algosdk.encodeUint64(escrowId)
             ];
 
             const txn = algosdk.makeApplicationCallTxnFromObject({
-                from: buyerAddress,
+                from: sellerAddress,
                 appIndex: this.ESCROW_APP_ID,
                 onComplete: algosdk.OnApplicationComplete.NoOpOC,
                 appArgs: appArgs,
+                boxes: this.recordBoxRefs(escrowId),
                 suggestedParams: params,
             });
 
@@ -175,27 +255,17 @@ class SmartContractService {
                 throw new Error('Smart Contract Service not initialized');
             }
 
-            const appInfo = await this.algodClient.getApplicationByID(this.MODEL_REGISTRY_APP_ID).do();
-            const globalState = appInfo.params['global-state'];
+            // Box layout: publisher(32) | timestamp(8) | cid_length(2) | cid | license_terms
+            const record = await this.readRecordBox(this.MODEL_REGISTRY_APP_ID, modelId);
+            const cidEnd = 42 + ((record[40] << 8) | record[41]);
+            const decoder = new TextDecoder();
 
-            // Parse global state to find model data
-            const modelData = {};
-            
-            for (const item of globalState) {
-                const key = Buffer.from(item.key, 'base64').toString();
-                
-                if (key.startsWith(`cid_${modelId}`)) {
-                    modelData.cid = Buffer.from(item.value.bytes, 'base64').toString();
-                } else if (key.startsWith(`pub_${modelId}`)) {
-                    modelData.publisher = algosdk.encodeAddress(Buffer.from(item.value.bytes, 'base64'));
-                } else if (key.startsWith(`lic_${modelId}`)) {
-                    modelData.license = Buffer.from(item.value.bytes, 'base64').toString();
-                } else if (key.startsWith(`ts_${modelId}`)) {
-                    modelData.timestamp = item.value.uint;
-                }
-            }
-
-            return modelData;
+            return {
+                publisher: algosdk.encodeAddress(record.slice(0, 32)),
+                timestamp: Number(algosdk.decodeUint64(record.slice(32, 40), 'bigint')),
+                cid: decoder.decode(record.slice(42, cidEnd)),
+                license: decoder.decode(record.slice(cidEnd))
+            };
 
         } catch (error) {
             console.error('❌ Error reading model from contract:', error);
@@ -205,6 +275,7 @@ class SmartContractService {
 
     /**
      * Get escrow status from Escrow contract
+     * Only pending escrows can be read: settlement deletes the escrow's box
      */
     async getEscrowStatus(escrowId) {
         try {
@@ -212,27 +283,17 @@ class SmartContractService {
                 throw new Error('Smart Contract Service not initialized');
             }
 
-            const appInfo = await this.algodClient.getApplicationByID(this.ESCROW_APP_ID).do();
-            const globalState = appInfo.params['global-state'];
-
-            // Parse global state to find escrow data
-            const escrowData = {};
-            
-            for (const item of globalState) {
-                const key = Buffer.from(item.key, 'base64').toString();
-                
-                if (key.startsWith(`status_${escrowId}`)) {
-                    escrowData.status = item.value.uint;
-                } else if (key.startsWith(`buyer_${escrowId}`)) {
-                    escrowData.buyer = algosdk.encodeAddress(Buffer.from(item.value.bytes, 'base64'));
-                } else if (key.startsWith(`seller_${escrowId}`)) {
-                    escrowData.seller = algosdk.encodeAddress(Buffer.from(item.value.bytes, 'base64'));
-                } else if (key.startsWith(`amount_${escrowId}`)) {
-                    escrowData.amount = item.value.uint;
-                }
-            }
+            // Box layout: model_id(8) | amount(8) | status(8) | settled(8) | created(8) | buyer(32) | publisher(32)
+            const record = await this.readRecordBox(this.ESCROW_APP_ID, escrowId);
+            const uint64At = offset => Number(algosdk.decodeUint64(record.slice(offset, offset + 8), 'bigint'));
 
-            return escrowData;
+            return {
+                modelId: uint64At(0),
+                amount: uint64At(8),
+                status: uint64At(16),
+                buyer: algosdk.encodeAddress(record.slice(40, 72)),
+                seller: algosdk.encodeAddress(record.slice(72, 104))
+            };
 
         } catch (error) {
             console.error('❌ Error reading escrow status:', error);
@@ -281,37 +342,73 @@ class SmartContractService {
     }
 
     /**
-     * Check if user has purchased a model (has completed escrow)
+     * The buyer's escrows for a model, from one indexer search over the
+     * Escrow app calls involving the buyer (followed across pages): they send
+     * create_escrow, and release_payment returns their box deposit to them.
+     * Returns the ids of the escrows created for the model and of every
+     * escrow released to its publisher.
      */
-    async hasUserPurchasedModel(modelId, userAddress) {
-        try {
-            // This would require tracking escrow IDs by model ID
-            // For now, we'll implement a simplified version
-            // In production, you'd want to maintain an index of escrows by model
-            
-            const appInfo = await this.algodClient.getApplicationByID(this.ESCROW_APP_ID).do();
-            const globalState = appInfo.params['global-state'];
-
-            // Look for completed escrows for this user and model
-            // This is a simplified implementation - in production you'd want better indexing
-            for (const item of globalState) {
-                const key = Buffer.from(item.key, 'base64').toString();
-                
-                if (key.startsWith('buyer_') && item.value.bytes) {
-                    const buyer = algosdk.encodeAddress(Buffer.from(item.value.bytes, 'base64'));
-                    if (buyer === userAddress) {
-                        // Found an escrow for this user, check if it's for this model
-                        const escrowId = key.split('_')[1];
-                        const escrowData = await this.getEscrowStatus(parseInt(escrowId));
-                        
-                        if (escrowData.status === 1) { // STATUS_RELEASED
-                            return true;
+    async searchBuyerEscrows(modelId, buyerAddress) {
+        const createSelector = Buffer.from(this.selector('createEscrow')).toString('base64');
+        const modelIdArg = Buffer.from(algosdk.encodeUint64(Number(modelId))).toString('base64');
+        const createdIds = [];
+        const releasedIds = new Set();
+        let nextToken;
+
+        do {
+            const search = this.indexerClient.searchForTransactions()
+                .applicationID(this.ESCROW_APP_ID)
+                .address(buyerAddress)
+                .txType('appl');
+            if (nextToken) {
+                search.nextToken(nextToken);
+            }
+            const page = await search.do();
+
+            for (const txn of page.transactions) {
+                // create_escrow(model_id, publisher, price): args[1] is the model id
+                const args = txn['application-transaction']['application-args'] || [];
+                const isCreate = args[0] === createSelector && args[1] === modelIdArg;
+
+                for (const log of txn.logs || []) {
+                    const bytes = new Uint8Array(Buffer.from(log, 'base64'));
+                    if (isCreate) {
+                        const escrowId = this.logRecordId(bytes, 'ESCROW_CREATED:');
+                        if (escrowId) {
+                            createdIds.push(escrowId);
                         }
                     }
+                    const releasedId = this.logRecordId(bytes, 'PAYMENT_RELEASED:');
+                    if (releasedId) {
+                        releasedIds.add(releasedId);
+                    }
                 }
             }
 
-            return false;
+            nextToken = page.transactions.length > 0 ? page['next-token'] : undefined;
+        } while (nextToken);
+
+        return { createdIds, releasedIds };
+    }
+
+    // The 8-byte big-endian id following a log's label, or 0 for other logs
+    logRecordId(log, label) {
+        const prefix = new TextEncoder().encode(label);
+        if (log.length < prefix.length + 8 || !prefix.every((byte, i) => log[i] === byte)) {
+            return 0;
+        }
+        return Number(algosdk.decodeUint64(log.slice(prefix.length, prefix.length + 8), 'bigint'));
+    }
+
+    /**
+     * Check if user has purchased a model (has completed escrow)
+     */
+    async hasUserPurchasedModel(modelId, userAddress) {
+        try {
+            // Settled escrows no longer have boxes, so the purchase is read
+            // from the buyer's create_escrow and release_payment history
+            const { createdIds, releasedIds } = await this.searchBuyerEscrows(modelId, userAddress);
+            return createdIds.some(escrowId => releasedIds.has(escrowId));
 
         } catch (error) {
             console.error('❌ Error checking model purchase status:', error);